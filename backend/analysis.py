@@ -6,6 +6,7 @@ import logging
 import math
 import random
 import statistics
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
@@ -33,16 +34,39 @@ def convert_to_serializable(value):
     return value
 
 
+def _serializable_values(series: pd.Series) -> list:
+    """A column as a list of JSON-ready values, converted per array instead of per cell"""
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        arr = series.to_numpy()
+        values = arr.tolist()
+        for i in np.flatnonzero(~np.isfinite(arr)):
+            values[i] = None
+        return values
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iub':
+        return series.to_numpy().tolist()
+    return [convert_to_serializable(v) for v in series]
+
+
 def clean_df(df, columns):
     """Clean dataframe for JSON serialization"""
-    df = df.copy().reset_index()
+    df = df.reset_index()
+    cols_to_include = [col for col in columns if col in df.columns]
+    values = [_serializable_values(df[col]) for col in cols_to_include]
     if 'Date' in df.columns:
-        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-    for col in columns:
-        if col in df.columns:
-            df[col] = df[col].apply(convert_to_serializable)
-    cols_to_include = ['Date'] + [col for col in columns if col in df.columns]
-    return df[cols_to_include].to_dict(orient='records')
+        cols_to_include = ['Date'] + cols_to_include
+        values.insert(0, df['Date'].dt.strftime('%Y-%m-%d').tolist())
+    return [dict(zip(cols_to_include, row)) for row in zip(*values)]
+
+
+def select_records(records: List[Dict], columns: List[str]) -> List[Dict]:
+    """Date plus `columns` of the clean_df records that have all of those columns set"""
+    keys = ['Date', *columns]
+    return [
+        {key: r[key] for key in keys if key in r}
+        for r in records
+        if all(r[col] is not None for col in columns)
+    ]
 
 
 # ==================== TECHNICAL INDICATORS ====================
@@ -173,6 +197,12 @@ GROQ_TASK_MAX_TOKENS = {
 }
 
 
+@lru_cache(maxsize=4)
+def _groq_client(api_key: str) -> "groq.Groq":
+    """One Groq client per API key, so its HTTP connection pool survives across calls"""
+    return groq.Groq(api_key=api_key)
+
+
 def call_groq_api(prompt: str, task_type: str = "chat") -> str:
     """
     Call the Groq API with intelligent model routing.
@@ -191,7 +221,7 @@ def call_groq_api(prompt: str, task_type: str = "chat") -> str:
     temperature = GROQ_TASK_TEMPERATURE.get(task_type, 0.7)
     max_tokens = GROQ_TASK_MAX_TOKENS.get(task_type, 1024)
 
-    client = groq.Groq(api_key=api_key)
+    client = _groq_client(api_key)
 
     for model in models_queue:
         try:
@@ -254,7 +284,7 @@ def screen_prompt_safety(user_message: str) -> tuple:
     # 2. Advanced LLM Pattern Screening (Prompt Guard)
     
     try:
-        client = groq.Groq(api_key=api_key)
+        client = _groq_client(api_key)
         
         # Use the guard model to classify the input
         safety_models = GROQ_MODEL_STACK.get("safety", [])
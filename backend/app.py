@@ -144,7 +144,7 @@ def create_app():
     # Flask-CORS can silently fail if middleware order or error handlers interfere.
     # These hooks guarantee CORS headers on EVERY response, no matter what.
     
-    allowed_origins = set(Config.CORS_ORIGINS)
+    allowed_origins = Config.CORS_ORIGINS
 
     @app.before_request
     def handle_preflight_and_logging():
@@ -3,18 +3,64 @@ Authentication Module
 Handles OAuth, JWT tokens, session management, and authentication middleware.
 """
 import logging
+import re
+import time
 from datetime import datetime, timedelta, timezone
-from functools import wraps
+from functools import lru_cache, wraps
 from typing import Dict, Optional
 
 import jwt
 import requests
 from flask import current_app, jsonify, request, session
+from google.auth.transport import requests as google_requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from backend.config import Config
 
 logger = logging.getLogger(__name__)
 
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+class CachingGoogleRequest:
+    """
+    google.auth transport that reuses one pooled HTTP session and keeps GET
+    responses (Google's signing certificates) for their Cache-Control max-age,
+    so ID token verification only refetches the certs when Google rotates them.
+    """
+
+    def __init__(self, http_session: requests.Session = None):
+        self._request = google_requests.Request(session=http_session or requests.Session())
+        self._responses = {}
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        if method != 'GET' or body is not None:
+            return self._request(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+        cached = self._responses.get(url)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        response = self._request(url, method=method, headers=headers, timeout=timeout, **kwargs)
+        max_age = _MAX_AGE_RE.search(response.headers.get('cache-control', ''))
+        if response.status == 200 and max_age:
+            self._responses[url] = (time.monotonic() + int(max_age.group(1)), response)
+        return response
+
+def _pooled_session() -> requests.Session:
+    """Session that keeps HTTPS connections alive and retries connection errors and 502/503/504"""
+    pooled = requests.Session()
+    pooled.mount('https://', HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    ))
+    return pooled
+
+# Shared by every OAuth callback in this process (token exchange and certificate fetches)
+http_session = _pooled_session()
+google_auth_request = CachingGoogleRequest(http_session)
+
 def generate_jwt_token(user_data: dict, secret: str, expires_in: str) -> str:
     """Generate JWT token"""
     if not secret:
@@ -31,6 +77,17 @@ def generate_jwt_token(user_data: dict, secret: str, expires_in: str) -> str:
     }
     return jwt.encode(payload, secret, algorithm='HS256')
 
+# Leeway on exp to account for minor clock skew
+JWT_LEEWAY_SECONDS = 10
+
+@lru_cache(maxsize=4096)
+def _decode_jwt(token: str, secret: str) -> dict:
+    """
+    Decode and signature-check an HS256 token. Invalid tokens raise, so only
+    valid payloads are cached and repeat polls with the same token skip the HMAC.
+    """
+    return jwt.decode(token, secret, algorithms=['HS256'], leeway=timedelta(seconds=JWT_LEEWAY_SECONDS))
+
 def verify_jwt_token(token: str, secret: str) -> Optional[dict]:
     """Verify JWT token"""
     if not secret:
@@ -38,11 +95,17 @@ def verify_jwt_token(token: str, secret: str) -> Optional[dict]:
         return None
     
     try:
-        # Add a 10-second leeway to account for minor clock skew.
-        return jwt.decode(token, secret, algorithms=['HS256'], leeway=timedelta(seconds=10))
+        payload = _decode_jwt(token, secret)
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError) as e:
         logger.warning(f"JWT verification failed: {e}")
         return None
+    
+    # A cached payload was checked when first decoded; its expiry still moves
+    exp = payload.get('exp')
+    if exp is not None and exp + JWT_LEEWAY_SECONDS < time.time():
+        logger.warning("JWT verification failed: Signature has expired")
+        return None
+    return dict(payload)
 
 def set_token_cookies(response, access_token: str, refresh_token: str):
     """Set cookies safely so browser actually stores them."""
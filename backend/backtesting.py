@@ -1,11 +1,24 @@
 import logging
 import os
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime
 from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
 
 logger = logging.getLogger(__name__)
 
@@ -13,11 +26,68 @@ from backend.data_providers import fetch_daily_ohlcv
 
 # SEBI Compliance Constants
 DATA_LAG_DAYS = 31
+_SEBI_LAG = pd.Timedelta(days=DATA_LAG_DAYS)
+
+# Without bottleneck, windowed views beat pandas rolling only while n * window stays small
+# (daily histories with short windows); past this size pandas' O(n) rolling sum wins.
+_WINDOW_VIEW_MAX_ELEMENTS = 200_000
+
+
+def _rolling_mean(values, window: int) -> np.ndarray:
+    """Trailing mean over `window` bars; NaN until the window is full (pandas semantics)."""
+    arr = np.asarray(values, dtype=np.float64)
+    if window > len(arr):
+        return np.full(len(arr), np.nan)
+    if bn is not None:
+        return bn.move_mean(arr, window=window, min_count=window)
+    if len(arr) * window <= _WINDOW_VIEW_MAX_ELEMENTS:
+        out = np.full(len(arr), np.nan)
+        out[window - 1:] = sliding_window_view(arr, window).mean(axis=1)
+        return out
+    return pd.Series(arr).rolling(window=window).mean().to_numpy()
+
+
+def _wilder_smooth(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Wilder's smoothing: seed with the mean of the first `window` values, then
+    y[i] = ((window - 1) * y[i-1] + x[i]) / window, which is an EWM with alpha = 1/window.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    tail = np.array(values[window - 1:], dtype=np.float64)
+    tail[0] = np.mean(values[:window])
+    out[window - 1:] = pd.Series(tail).ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+    return out
+
+
+def _shift(arr: np.ndarray, periods: int) -> np.ndarray:
+    """Lag `arr` by `periods` bars, NaN-padding the front like Series.shift()."""
+    out = np.full(len(arr), np.nan)
+    if periods < len(arr):
+        out[periods:] = arr[:len(arr) - periods]
+    return out
+
+
+def _cross_up(a, b) -> np.ndarray:
+    """True on bars where `a` closes above `b` after being at or below it on the previous bar."""
+    diff = np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)
+    out = np.zeros(len(diff), dtype=bool)
+    out[1:] = (diff[1:] > 0) & (diff[:-1] <= 0)
+    return out
+
+
+def _cross_down(a, b) -> np.ndarray:
+    """True on bars where `a` closes below `b` after being at or above it on the previous bar."""
+    diff = np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)
+    out = np.zeros(len(diff), dtype=bool)
+    out[1:] = (diff[1:] < 0) & (diff[:-1] >= 0)
+    return out
 
 
 def get_data_lag_date() -> datetime:
     """Get the effective date with 31-day SEBI compliance lag."""
-    return datetime.now() - pd.Timedelta(days=DATA_LAG_DAYS)
+    return datetime.now() - _SEBI_LAG
 
 
 def check_data_availability(symbol: str = None) -> Dict:
@@ -125,94 +195,230 @@ def apply_sebi_lag(df: pd.DataFrame) -> pd.DataFrame:
     if getattr(df.index, 'tz', None) is not None:
         lag_ts = lag_ts.tz_localize(df.index.tz)
         
-    filtered_df = df[df.index <= lag_ts].copy()
+    if df.index.is_monotonic_increasing:
+        # Binary-search the cutoff; the shallow copy skips copying every row, so
+        # callers that add or modify columns copy the (usually much smaller) result
+        filtered_df = df.iloc[:df.index.searchsorted(lag_ts, side='right')].copy(deep=False)
+    else:
+        filtered_df = df[df.index <= lag_ts].copy()
     
     if len(filtered_df) < original_count:
         logger.info(f"Applied {DATA_LAG_DAYS}-day SEBI lag: excluded {original_count - len(filtered_df)} rows")
     
     return filtered_df
 
+def _slice_date_range(df: pd.DataFrame, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    Positional view of `df` between start_date and end_date (both inclusive).
+    Binary-searches the sorted DatetimeIndex; a date-only end_date covers that whole day,
+    as partial-string .loc slicing does.
+    """
+    index = df.index
+    if not index.is_monotonic_increasing:
+        if start_date:
+            df = df.loc[start_date:]
+        if end_date:
+            df = df.loc[:end_date]
+        return df
+
+    def _localize(ts):
+        return ts.tz_localize(index.tz) if index.tz is not None and ts.tzinfo is None else ts
+
+    lo, hi = 0, len(index)
+    if start_date:
+        lo = index.searchsorted(_localize(pd.Timestamp(start_date)), side='left')
+    if end_date:
+        end_ts = _localize(pd.Timestamp(end_date))
+        if end_ts == end_ts.normalize():
+            hi = index.searchsorted(end_ts + pd.Timedelta(days=1), side='left')
+        else:
+            hi = index.searchsorted(end_ts, side='right')
+    return df.iloc[lo:hi]
+
+
+# Indicator groups each strategy reads. ATR is always included because
+# get_performance_summary uses it for stop-loss and position sizing.
+STRATEGY_INDICATORS = {
+    'golden_cross': ('ma', 'atr'),
+    'rsi': ('rsi', 'atr'),
+    'macd': ('macd', 'atr'),
+    'composite': ('ma', 'macd', 'atr', 'adx', 'vol'),
+    'momentum': ('ma', 'momentum', 'vol', 'atr'),
+    'mean_reversion': ('bb', 'rsi', 'atr'),
+    'breakout': ('ma', 'vol', 'atr', 'adx'),
+}
+
+_INDICATOR_METHODS = {
+    'ma': 'add_moving_averages',
+    'rsi': 'add_rsi',
+    'macd': 'add_macd',
+    'atr': 'add_atr',
+    'adx': 'add_adx',
+    'vol': 'add_volume_analysis',
+    'momentum': 'add_momentum',
+    'bb': 'add_bollinger_bands',
+}
+
+
+# Indicator groups the optional Polars backend builds in a single lazy plan.
+# RSI, ATR and ADX rely on Wilder-seeded recursions and stay on the NumPy path.
+_POLARS_INDICATORS = ('ma', 'macd', 'vol', 'momentum', 'bb')
+
+
 class BacktestEngine:
-    def __init__(self, df):
+    def __init__(self, df, backend="numpy"):
         """
         Initialize with a DataFrame. 
         Expects columns: 'Open', 'High', 'Low', 'Close', 'Volume' (case insensitive).
+        The OHLCV data is shared with the caller rather than copied, so the caller must not
+        mutate those columns while the engine is in use; indicators only ever add new columns.
+        backend="polars" computes window/EWM indicators with Polars when it is installed.
         """
-        self.df = df.copy()
+        if backend not in ("numpy", "polars"):
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == "polars" and pl is None:
+            logger.warning("polars not installed; falling back to NumPy indicators")
+            backend = "numpy"
+        self.backend = backend
+
+        # Shallow copy: new column labels and indicator columns stay local to the engine
+        self.df = df.copy(deep=False)
         # Normalize column names to lowercase for consistency
         self.df.columns = [c.lower() for c in self.df.columns]
         self.signals = pd.DataFrame(index=self.df.index)
-        self.signals['signal'] = 0  # 0: Hold, 1: Buy, -1: Sell
+        self.signals['signal'] = np.zeros(len(self.df), dtype=np.int8)  # 0: Hold, 1: Buy, -1: Sell
+        self._computed_indicators = set()
+
+        # Contiguous float64 views of the raw OHLCV columns; indicators read these
+        # instead of going back through the DataFrame on every calculation.
+        self._open, self._high, self._low, self._close, self._volume = (
+            self.df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume')
+        )
 
     def add_moving_averages(self, short_window=50, long_window=200):
         """Calculates Simple Moving Averages."""
-        self.df['sma_short'] = self.df['close'].rolling(window=short_window).mean()
-        self.df['sma_long'] = self.df['close'].rolling(window=long_window).mean()
+        self.df['sma_short'] = _rolling_mean(self._close, short_window)
+        self.df['sma_long'] = _rolling_mean(self._close, long_window)
 
     def add_rsi(self, window=14):
         """Calculates Relative Strength Index."""
-        delta = self.df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+        delta = np.diff(self._close)
+        avg_gain = _wilder_smooth(np.where(delta > 0, delta, 0.0), window)
+        avg_loss = _wilder_smooth(np.where(delta < 0, -delta, 0.0), window)
 
-        rs = gain / loss
-        self.df['rsi'] = 100 - (100 / (1 + rs))
+        rsi = np.full(len(self._close), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gain / avg_loss
+            rsi[1:] = 100 - (100 / (1 + rs))
+        self.df['rsi'] = rsi
 
     def add_macd(self, span_short=12, span_long=26, span_signal=9):
         """Calculates MACD and Signal line."""
-        ema_short = self.df['close'].ewm(span=span_short, adjust=False).mean()
-        ema_long = self.df['close'].ewm(span=span_long, adjust=False).mean()
+        close = pd.Series(self._close)
+        ema_short = close.ewm(span=span_short, adjust=False).mean().to_numpy()
+        ema_long = close.ewm(span=span_long, adjust=False).mean().to_numpy()
         
-        self.df['macd'] = ema_short - ema_long
-        self.df['macd_signal'] = self.df['macd'].ewm(span=span_signal, adjust=False).mean()
+        macd = ema_short - ema_long
+        self.df['macd'] = macd
+        self.df['macd_signal'] = pd.Series(macd).ewm(span=span_signal, adjust=False).mean().to_numpy()
 
     def add_atr(self, period=14):
         """Calculates Average True Range for Volatility Sizing."""
-        high_low = self.df['high'] - self.df['low']
-        high_close = np.abs(self.df['high'] - self.df['close'].shift())
-        low_close = np.abs(self.df['low'] - self.df['close'].shift())
-        
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = ranges.max(axis=1)
-        
-        self.df['atr'] = true_range.rolling(window=period).mean()
+        high, low = self._high, self._low
+        prev_close = _shift(self._close, 1)
+
+        # fmax ignores NaN like DataFrame.max(axis=1), so the first bar falls back to high - low
+        true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+        self.df['atr'] = _rolling_mean(true_range, period)
 
     def add_adx(self, period=14):
         """Calculates ADX and Directional Indicators (+DI, -DI)."""
-        plus_dm = self.df['high'].diff()
-        minus_dm = -self.df['low'].diff()
+        plus_dm = np.diff(self._high, prepend=np.nan)
+        minus_dm = -np.diff(self._low, prepend=np.nan)
         plus_dm[plus_dm < 0] = 0
         minus_dm[minus_dm < 0] = 0
         
-        tr = self.df['atr'] # Assumes ATR is already calculated
+        tr = self.df['atr'].to_numpy() # Assumes ATR is already calculated
         
         # Using simple ewm for smoothing (Wilder's approximation)
-        self.df['plus_di'] = 100 * (plus_dm.ewm(alpha=1/period, adjust=False).mean() / tr)
-        self.df['minus_di'] = 100 * (minus_dm.ewm(alpha=1/period, adjust=False).mean() / tr)
-        
-        plus_di = self.df['plus_di']
-        minus_di = self.df['minus_di']
-        
-        dx = (np.abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
-        self.df['adx'] = dx.rolling(window=period).mean()
+        plus_smooth = pd.Series(plus_dm).ewm(alpha=1/period, adjust=False).mean().to_numpy()
+        minus_smooth = pd.Series(minus_dm).ewm(alpha=1/period, adjust=False).mean().to_numpy()
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plus_di = 100 * (plus_smooth / tr)
+            minus_di = 100 * (minus_smooth / tr)
+            dx = (np.abs(plus_di - minus_di) / (plus_di + minus_di)) * 100
+
+        self.df['plus_di'] = plus_di
+        self.df['minus_di'] = minus_di
+        self.df['adx'] = _rolling_mean(dx, period)
 
     def add_volume_analysis(self, window=20):
         """Calculates Volume Moving Average to detect spikes."""
-        self.df['vol_ma'] = self.df['volume'].rolling(window=window).mean()
+        vol_ma = _rolling_mean(self._volume, window)
+        self.df['vol_ma'] = vol_ma
         # Flag if volume is 2x the average
-        self.df['vol_spike'] = self.df['volume'] > (self.df['vol_ma'] * 2.0)
+        self.df['vol_spike'] = self._volume > (vol_ma * 2.0)
 
     def add_momentum(self, period=10):
         """Calculates momentum for momentum strategy."""
-        self.df['momentum'] = self.df['close'] - self.df['close'].shift(period)
-        self.df['momentum_pct'] = ((self.df['close'] - self.df['close'].shift(period)) / self.df['close'].shift(period)) * 100
+        prev_close = _shift(self._close, period)
+        momentum = self._close - prev_close
+        self.df['momentum'] = momentum
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.df['momentum_pct'] = (momentum / prev_close) * 100
 
     def add_bollinger_bands(self, period=20, std_dev=2):
         """Calculates Bollinger Bands for mean reversion strategy."""
-        self.df['bb_middle'] = self.df['close'].rolling(window=period).mean()
-        self.df['bb_std'] = self.df['close'].rolling(window=period).std()
-        self.df['bb_upper'] = self.df['bb_middle'] + (self.df['bb_std'] * std_dev)
-        self.df['bb_lower'] = self.df['bb_middle'] - (self.df['bb_std'] * std_dev)
+        close = self._close
+        middle = _rolling_mean(close, period)
+        # Sample std from E[x^2] - E[x]^2 reuses the mean pass instead of a second rolling std;
+        # the clamp guards against tiny negative variances from floating-point cancellation.
+        mean_sq = _rolling_mean(close * close, period)
+        bessel = period / (period - 1) if period > 1 else np.nan  # ddof=1, matching rolling().std()
+        variance = np.maximum(mean_sq - middle * middle, 0.0) * bessel
+        std = np.sqrt(variance)
+        self.df['bb_middle'] = middle
+        self.df['bb_std'] = std
+        self.df['bb_upper'] = middle + (std * std_dev)
+        self.df['bb_lower'] = middle - (std * std_dev)
+
+    def _add_indicators_polars(self, names):
+        """
+        Build the requested Polars-capable indicator groups in one multi-threaded pass,
+        using the same default windows as the matching add_* methods.
+        """
+        close, volume = pl.col('close'), pl.col('volume')
+        prev_close = close.shift(10)
+        ema_diff = close.ewm_mean(span=12, adjust=False) - close.ewm_mean(span=26, adjust=False)
+        vol_ma = volume.rolling_mean(20)
+        bb_middle, bb_std = close.rolling_mean(20), close.rolling_std(20)
+        exprs = {
+            'ma': [close.rolling_mean(50).alias('sma_short'), close.rolling_mean(200).alias('sma_long')],
+            'macd': [ema_diff.alias('macd'), ema_diff.ewm_mean(span=9, adjust=False).alias('macd_signal')],
+            'vol': [vol_ma.alias('vol_ma'), (volume > vol_ma * 2.0).fill_null(False).alias('vol_spike')],
+            'momentum': [(close - prev_close).alias('momentum'),
+                         ((close - prev_close) / prev_close * 100).alias('momentum_pct')],
+            'bb': [bb_middle.alias('bb_middle'), bb_std.alias('bb_std'),
+                   (bb_middle + bb_std * 2).alias('bb_upper'), (bb_middle - bb_std * 2).alias('bb_lower')],
+        }
+        plan = pl.LazyFrame({'close': self._close, 'volume': self._volume}).select(
+            [expr for name in names for expr in exprs[name]]
+        )
+        result = plan.collect()
+        for col in result.columns:
+            self.df[col] = result[col].to_numpy()
+        self._computed_indicators.update(names)
+
+    def _ensure_indicator(self, name):
+        """Compute an indicator group (and anything it depends on) at most once."""
+        if name in self._computed_indicators:
+            return
+        if name == 'adx':
+            self._ensure_indicator('atr')  # ADX divides by ATR
+        getattr(self, _INDICATOR_METHODS[name])()
+        self._computed_indicators.add(name)
 
     def run_strategy(self, strategy_name="composite"):
         """
@@ -220,111 +426,108 @@ class BacktestEngine:
         Returns the DataFrame with signals and indicators.
         Available strategies: 'golden_cross', 'rsi', 'macd', 'composite', 'momentum', 'mean_reversion', 'breakout'
         """
-        # Ensure indicators are present
-        self.add_moving_averages()
-        self.add_rsi()
-        self.add_macd()
-        self.add_atr()
-        self.add_adx()
-        self.add_volume_analysis()
-        self.add_momentum()
-        self.add_bollinger_bands()
-
-        # Use a temporary Series for triggers (1=Buy, -1=Sell)
-        triggers = pd.Series(0, index=self.df.index)
+        if strategy_name not in STRATEGY_INDICATORS:
+            raise ValueError(f"Unknown strategy: {strategy_name}")
+
+        # Ensure the indicators this strategy reads are present
+        if self.backend == "polars":
+            batch = [i for i in STRATEGY_INDICATORS[strategy_name]
+                     if i in _POLARS_INDICATORS and i not in self._computed_indicators]
+            if batch:
+                self._add_indicators_polars(batch)
+        for indicator in STRATEGY_INDICATORS[strategy_name]:
+            self._ensure_indicator(indicator)
+
+        # Use a temporary int8 array for triggers (1=Buy, -1=Sell)
+        triggers = np.zeros(len(self.df), dtype=np.int8)
+
+        # NumPy views of the indicator columns, so every condition below is a plain array op
+        ind = {name: self.df[name].to_numpy() for name in self.df.columns}
 
         # --- Pattern Logic ---
         
         if strategy_name == "golden_cross":
             # Buy: Short MA crosses above Long MA
             # Sell: Short MA crosses below Long MA
-            buy_cond = (self.df['sma_short'] > self.df['sma_long']) & \
-                            (self.df['sma_short'].shift(1) <= self.df['sma_long'].shift(1))
-            
-            sell_cond = (self.df['sma_short'] < self.df['sma_long']) & \
-                             (self.df['sma_short'].shift(1) >= self.df['sma_long'].shift(1))
+            buy_cond = _cross_up(ind['sma_short'], ind['sma_long'])
+            sell_cond = _cross_down(ind['sma_short'], ind['sma_long'])
 
         elif strategy_name == "rsi":
             # Buy: RSI crosses below 30 (Oversold entry)
             # Sell: RSI crosses above 70 (Overbought exit)
-            buy_cond = (self.df['rsi'] < 30) & (self.df['rsi'].shift(1) >= 30)
-            sell_cond = (self.df['rsi'] > 70) & (self.df['rsi'].shift(1) <= 70)
+            buy_cond = _cross_down(ind['rsi'], 30)
+            sell_cond = _cross_up(ind['rsi'], 70)
 
         elif strategy_name == "macd":
             # Buy: MACD crosses above Signal
             # Sell: MACD crosses below Signal
-            buy_cond = (self.df['macd'] > self.df['macd_signal']) & \
-                            (self.df['macd'].shift(1) <= self.df['macd_signal'].shift(1))
-            
-            sell_cond = (self.df['macd'] < self.df['macd_signal']) & \
-                             (self.df['macd'].shift(1) >= self.df['macd_signal'].shift(1))
+            buy_cond = _cross_up(ind['macd'], ind['macd_signal'])
+            sell_cond = _cross_down(ind['macd'], ind['macd_signal'])
 
         elif strategy_name == "composite":
             # Enhanced Logic:
             # Buy: (Golden Cross OR MACD Cross) AND Volume > Average AND (ADX > 20 & +DI > -DI)
             # Sell: Trend Breaks (+DI < -DI)
-            ma_buy = (self.df['sma_short'] > self.df['sma_long']) & \
-                     (self.df['sma_short'].shift(1) <= self.df['sma_long'].shift(1))
-            
-            macd_buy = (self.df['macd'] > self.df['macd_signal']) & \
-                       (self.df['macd'].shift(1) <= self.df['macd_signal'].shift(1))
+            ma_buy = _cross_up(ind['sma_short'], ind['sma_long'])
+            macd_buy = _cross_up(ind['macd'], ind['macd_signal'])
             
-            vol_confirmation = self.df['volume'] > self.df['vol_ma']
+            vol_confirmation = ind['volume'] > ind['vol_ma']
             
             # Regime Filter: Strong Trend (ADX > 20) AND Bullish Direction (+DI > -DI)
-            trend_confirmation = (self.df['adx'] > 20) & (self.df['plus_di'] > self.df['minus_di'])
+            trend_confirmation = (ind['adx'] > 20) & (ind['plus_di'] > ind['minus_di'])
 
             buy_cond = (ma_buy | macd_buy) & vol_confirmation & trend_confirmation
             
             # Sell when the bullish trend breaks
-            sell_cond = self.df['plus_di'] < self.df['minus_di']
+            sell_cond = ind['plus_di'] < ind['minus_di']
 
         elif strategy_name == "momentum":
             # Buy: Price crossover with positive momentum
             # Sell: Negative momentum or trend reversal
-            price_above_ma = self.df['close'] > self.df['sma_short']
-            positive_momentum = self.df['momentum_pct'] > 2.0
-            vol_conf = self.df['volume'] > self.df['vol_ma']
+            price_above_ma = ind['close'] > ind['sma_short']
+            positive_momentum = ind['momentum_pct'] > 2.0
+            vol_conf = ind['volume'] > ind['vol_ma']
             
             buy_cond = price_above_ma & positive_momentum & vol_conf
             
-            sell_cond = (self.df['momentum_pct'] < -1.0) | \
-                       (self.df['close'] < self.df['sma_short'])
+            sell_cond = (ind['momentum_pct'] < -1.0) | \
+                       (ind['close'] < ind['sma_short'])
 
         elif strategy_name == "mean_reversion":
             # Buy: Close below lower Bollinger Band AND RSI < 35
             # Sell: Close above upper Bollinger Band OR RSI > 65
-            buy_cond = (self.df['close'] < self.df['bb_lower']) & (self.df['rsi'] < 35)
+            buy_cond = (ind['close'] < ind['bb_lower']) & (ind['rsi'] < 35)
             
-            sell_cond = (self.df['close'] > self.df['bb_upper']) | (self.df['rsi'] > 65)
+            sell_cond = (ind['close'] > ind['bb_upper']) | (ind['rsi'] > 65)
 
         elif strategy_name == "breakout":
             # Buy: Price breaks above MA with high volume
             # Sell: Price breaks below MA or momentum reversal
-            ma_breakout = (self.df['close'] > self.df['sma_short']) & \
-                         (self.df['close'].shift(1) <= self.df['sma_short'].shift(1))
-            vol_surge = self.df['volume'] > (self.df['vol_ma'] * 1.5)
-            adx_strong = self.df['adx'] > 25
+            ma_breakout = _cross_up(ind['close'], ind['sma_short'])
+            vol_surge = ind['volume'] > (ind['vol_ma'] * 1.5)
+            adx_strong = ind['adx'] > 25
             
             buy_cond = ma_breakout & vol_surge & adx_strong
             
-            sell_cond = (self.df['close'] < self.df['sma_short']) & \
-                       (self.df['minus_di'] > self.df['plus_di'])
+            sell_cond = (ind['close'] < ind['sma_short']) & \
+                       (ind['minus_di'] > ind['plus_di'])
         
         else:
             raise ValueError(f"Unknown strategy: {strategy_name}")
 
         # Apply Triggers
-        triggers.loc[buy_cond] = 1
-        triggers.loc[sell_cond] = -1
+        triggers[np.asarray(buy_cond, dtype=bool)] = 1
+        triggers[np.asarray(sell_cond, dtype=bool)] = -1
 
         # Signal Persistence (State Flag)
-        # We ffill() the state so we stay Long (1) until a Sell (-1) happens.
-        self.signals['signal'] = triggers.replace(0, np.nan).ffill().fillna(0)
+        # Carry the last non-zero trigger forward so we stay Long (1) until a Sell (-1) happens:
+        # a running max over the positions of non-zero triggers gives the latest one per bar.
+        last_trigger = np.maximum.accumulate(np.where(triggers != 0, np.arange(len(triggers)), 0))
+        state = triggers[last_trigger]
         
         # Convert to Binary State: 1 = Long, 0 = Cash
         # (If signal was -1, it becomes 0)
-        self.signals['signal'] = self.signals['signal'].apply(lambda x: 1 if x > 0 else 0)
+        self.signals['signal'] = (state > 0).astype(np.int8)
 
         # Merge signals back into main DF for visualization/export
         result = self.df.join(self.signals['signal'])
@@ -338,11 +541,7 @@ class BacktestEngine:
         Handles: Next Day Open Execution, Volatility Sizing, Dynamic ATR Stops, Gaps, Taxes.
         """
         # Prepare Data
-        df_sim = self.df.join(self.signals['signal'])
-        if start_date:
-            df_sim = df_sim.loc[start_date:]
-        if end_date:
-            df_sim = df_sim.loc[:end_date]
+        df_sim = _slice_date_range(self.df.join(self.signals['signal']), start_date, end_date)
 
         if df_sim.empty:
             return {"error": True, "message": "No data found for the specified date range."}
@@ -350,7 +549,7 @@ class BacktestEngine:
         # Simulation State
         cash = initial_capital
         shares = 0
-        portfolio_values = []
+        portfolio_values = np.empty(len(df_sim), dtype=np.float64)
         highest_price_since_entry = 0
         
         trades = []
@@ -360,17 +559,22 @@ class BacktestEngine:
         # We iterate through the DataFrame. 
         # Logic: Decisions made on Day T (using Close/Signals) are executed on Day T+1 Open.
         
+        # Pull columns out as arrays once; per-bar iloc/label lookups dominated this loop.
         dates = df_sim.index
+        open_ = df_sim['open'].to_numpy()
+        high = df_sim['high'].to_numpy()
+        low = df_sim['low'].to_numpy()
+        close = df_sim['close'].to_numpy()
+        atr_values = df_sim['atr'].to_numpy()
+        signals = df_sim['signal'].to_numpy()
+        
         for i in range(len(df_sim) - 1):
-            today = df_sim.iloc[i]
-            next_day = df_sim.iloc[i+1]
-            
             # 1. Update Portfolio Value (Mark to Market)
-            current_val = cash + (shares * today['close'])
-            portfolio_values.append(current_val)
+            current_val = cash + (shares * close[i])
+            portfolio_values[i] = current_val
             
             # 2. Determine Execution for Next Day
-            signal = today['signal'] # 1 = Hold/Buy, 0 = Cash/Sell
+            signal = signals[i] # 1 = Hold/Buy, 0 = Cash/Sell
             
             exit_price = None
             exit_reason = None
@@ -378,18 +582,18 @@ class BacktestEngine:
             # A) Check Stop Loss (Dynamic ATR)
             if shares > 0 and atr_multiplier > 0:
                 # Update highest price seen during trade (using Today's High)
-                highest_price_since_entry = max(highest_price_since_entry, today['high'])
+                highest_price_since_entry = max(highest_price_since_entry, high[i])
                 
-                atr = today['atr']
+                atr = atr_values[i]
                 if pd.notna(atr) and atr > 0:
                     stop_price = highest_price_since_entry - (atr * atr_multiplier)
                     
                     # Check Gap Down (Open < Stop)
-                    if next_day['open'] < stop_price:
-                        exit_price = next_day['open']
+                    if open_[i + 1] < stop_price:
+                        exit_price = open_[i + 1]
                         exit_reason = "Stop Loss (Gap)"
                     # Check Intraday Breach (Low < Stop)
-                    elif next_day['low'] < stop_price:
+                    elif low[i + 1] < stop_price:
                         exit_price = stop_price
                         exit_reason = "Stop Loss (Intraday)"
             
@@ -398,7 +602,7 @@ class BacktestEngine:
             if shares > 0 and signal == 0:
                 # If we haven't already gapped down below stop, we sell at Open
                 if exit_price is None or exit_reason == "Stop Loss (Intraday)":
-                    exit_price = next_day['open']
+                    exit_price = open_[i + 1]
                     exit_reason = "Signal Exit"
             
             # --- EXECUTE SELL ---
@@ -416,7 +620,7 @@ class BacktestEngine:
                 pnl_pct = ((exec_price - entry_price) / entry_price) * 100
                 trades.append({
                     'entry_date': entry_date.strftime('%Y-%m-%d') if entry_date else 'N/A',
-                    'exit_date': next_day.name.strftime('%Y-%m-%d'),
+                    'exit_date': dates[i + 1].strftime('%Y-%m-%d'),
                     'entry_price': entry_price,
                     'exit_price': exec_price,
                     'pnl_pct': pnl_pct,
@@ -430,13 +634,13 @@ class BacktestEngine:
             # --- EXECUTE BUY ---
             elif shares == 0 and signal == 1:
                 # Execute Buy at Next Day Open
-                exec_price = next_day['open']
+                exec_price = open_[i + 1]
                 
                 # Volatility Sizing (ATR)
                 # Rule: Risk 2% of capital per trade. Stop distance is 2 * ATR.
                 # Position Size = (Capital * 0.02) / (2 * ATR) -> Simplified: Capital * 0.01 / ATR
                 # If ATR is missing, default to 100% equity.
-                atr = today['atr']
+                atr = atr_values[i]
                 if pd.notna(atr) and atr > 0:
                     risk_per_trade = current_val * 0.02 # 2% Risk
                     stop_distance = 2 * atr
@@ -458,11 +662,10 @@ class BacktestEngine:
                     shares = shares_to_buy
                     highest_price_since_entry = exec_price # Initialize with entry price
                     entry_price = exec_price
-                    entry_date = next_day.name
+                    entry_date = dates[i + 1]
 
-        # Append last day value
-        last_val = cash + (shares * df_sim.iloc[-1]['close'])
-        portfolio_values.append(last_val)
+        # Last day value
+        portfolio_values[-1] = cash + (shares * close[-1])
         
         # Create Series for Metrics
         equity_curve = pd.Series(portfolio_values, index=df_sim.index)
@@ -518,28 +721,38 @@ def get_parquet_path(symbol: str) -> Optional[str]:
     return file_path
 
 
-# Cache for loaded stock data to reduce latency
-_stock_data_cache: Dict[str, Tuple[pd.DataFrame, datetime]] = {}
-CACHE_TTL_SECONDS = 300  # Cache data for 5 minutes
+# Cache for loaded stock data to reduce latency.
+# Keyed by parquet path and validated against the file's mtime, so a rewritten
+# file is re-read on the next request. Least recently used entries are evicted first.
+_stock_data_cache: "OrderedDict[str, Tuple[pd.DataFrame, float]]" = OrderedDict()
+STOCK_CACHE_MAX_ENTRIES = 32
 
 
-def _get_cached_stock_data(symbol: str) -> Optional[pd.DataFrame]:
-    """Get stock data from cache if available and not expired."""
-    if symbol in _stock_data_cache:
-        df, timestamp = _stock_data_cache[symbol]
-        if datetime.now() - timestamp < timedelta(seconds=CACHE_TTL_SECONDS):
-            logger.info(f"Cache hit for {symbol}")
-            return df.copy()
-        else:
-            logger.info(f"Cache expired for {symbol}")
-            del _stock_data_cache[symbol]
-    return None
+def _get_cached_stock_data(file_path: str, mtime: float) -> Optional[pd.DataFrame]:
+    """
+    Get stock data from cache if the file hasn't changed since it was read.
+    The returned frame is shared with the cache and must not be mutated in place.
+    """
+    entry = _stock_data_cache.get(file_path)
+    if entry is None:
+        return None
+    df, cached_mtime = entry
+    if cached_mtime != mtime:
+        logger.info(f"Cache stale for {file_path}")
+        del _stock_data_cache[file_path]
+        return None
+    _stock_data_cache.move_to_end(file_path)
+    logger.info(f"Cache hit for {file_path}")
+    return df
 
 
-def _set_cached_stock_data(symbol: str, df: pd.DataFrame):
-    """Store stock data in cache."""
-    _stock_data_cache[symbol] = (df.copy(), datetime.now())
-    logger.info(f"Cached data for {symbol}")
+def _set_cached_stock_data(file_path: str, mtime: float, df: pd.DataFrame):
+    """Store stock data in cache, evicting the least recently used entry when full."""
+    _stock_data_cache[file_path] = (df, mtime)
+    _stock_data_cache.move_to_end(file_path)
+    while len(_stock_data_cache) > STOCK_CACHE_MAX_ENTRIES:
+        _stock_data_cache.popitem(last=False)
+    logger.info(f"Cached data for {file_path}")
 
 def load_stock_data(symbol: str, apply_lag: bool = True) -> Tuple[Optional[pd.DataFrame], Dict]:
     """
@@ -556,61 +769,44 @@ def load_stock_data(symbol: str, apply_lag: bool = True) -> Tuple[Optional[pd.Da
     try:
         symbol_upper = symbol.upper().strip()
         
-        # Try to get from cache first
-        cached_df = _get_cached_stock_data(symbol_upper)
-        if cached_df is not None:
-            compliance_info = {
-                'symbol': symbol_upper,
-                'original_rows': len(cached_df),
-                'date_range': {
-                    'start': cached_df.index.min().strftime('%Y-%m-%d'),
-                    'end': cached_df.index.max().strftime('%Y-%m-%d')
-                },
-                'lag_applied': apply_lag,
-                'lag_days': DATA_LAG_DAYS if apply_lag else 0,
-                'cached': True
-            }
-            
-            # Apply SEBI compliance lag if requested
-            if apply_lag:
-                df = apply_sebi_lag(cached_df.copy())
-                compliance_info['filtered_rows'] = len(df)
-                compliance_info['rows_excluded'] = compliance_info['original_rows'] - len(df)
-                compliance_info['effective_end_date'] = df.index.max().strftime('%Y-%m-%d') if not df.empty else None
-                return df, compliance_info
-            else:
-                return cached_df.copy(), compliance_info
-        
         file_path = get_parquet_path(symbol_upper)
         if not file_path:
             return None, {'error': f'No data found for symbol {symbol_upper}'}
         
-        if not os.path.exists(file_path):
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
             logger.error(f"Parquet file not found: {file_path}")
             return None, {'error': f'Data file not found for {symbol_upper}'}
         
-        logger.info(f"Loading data from {file_path}")
-        df = pd.read_parquet(file_path, engine='pyarrow')
-        
-        # Ensure the DataFrame has a DatetimeIndex
-        if not isinstance(df.index, pd.DatetimeIndex):
-            # Check if there is a 'Date' column to use as index
-            date_col = next((c for c in df.columns if c.lower() == 'date'), None)
-            if date_col:
-                logger.info(f"Converting column '{date_col}' to Datetime Index...")
-                df[date_col] = pd.to_datetime(df[date_col])
-                df.set_index(date_col, inplace=True)
-            else:
-                # Attempt to convert the existing index to datetime
-                df.index = pd.to_datetime(df.index)
-        
-        # Standardize column names to PascalCase for consistency across the application
-        # This avoids repeated column name conversions in routes
-        df.columns = [col.title().replace('_', '') for col in df.columns]
-        df.index.name = 'Date'
+        # Try to get from cache first
+        df = _get_cached_stock_data(file_path, mtime)
+        cached = df is not None
         
-        # Cache the standardized data before applying lag
-        _set_cached_stock_data(symbol_upper, df)
+        if not cached:
+            logger.info(f"Loading data from {file_path}")
+            # self_destruct frees Arrow buffers as they're converted, so the file isn't held twice
+            df = pq.read_table(file_path).to_pandas(self_destruct=True, split_blocks=True, use_threads=True)
+            
+            # Ensure the DataFrame has a DatetimeIndex
+            if not isinstance(df.index, pd.DatetimeIndex):
+                # Check if there is a 'Date' column to use as index
+                date_col = next((c for c in df.columns if c.lower() == 'date'), None)
+                if date_col:
+                    logger.info(f"Converting column '{date_col}' to Datetime Index...")
+                    df[date_col] = pd.to_datetime(df[date_col])
+                    df.set_index(date_col, inplace=True)
+                else:
+                    # Attempt to convert the existing index to datetime
+                    df.index = pd.to_datetime(df.index)
+            
+            # Standardize column names to PascalCase for consistency across the application
+            # This avoids repeated column name conversions in routes
+            df.columns = [col.title().replace('_', '') for col in df.columns]
+            df.index.name = 'Date'
+            
+            # Cache the standardized data before applying lag
+            _set_cached_stock_data(file_path, mtime, df)
         
         compliance_info = {
             'symbol': symbol_upper,
@@ -621,7 +817,7 @@ def load_stock_data(symbol: str, apply_lag: bool = True) -> Tuple[Optional[pd.Da
             },
             'lag_applied': apply_lag,
             'lag_days': DATA_LAG_DAYS if apply_lag else 0,
-            'cached': False
+            'cached': cached
         }
         
         # Apply SEBI compliance lag if requested
@@ -630,6 +826,9 @@ def load_stock_data(symbol: str, apply_lag: bool = True) -> Tuple[Optional[pd.Da
             compliance_info['filtered_rows'] = len(df)
             compliance_info['rows_excluded'] = compliance_info['original_rows'] - len(df)
             compliance_info['effective_end_date'] = df.index.max().strftime('%Y-%m-%d') if not df.empty else None
+        else:
+            # Shallow copy: callers may add columns without touching the cached frame
+            df = df.copy(deep=False)
         
         return df, compliance_info
     
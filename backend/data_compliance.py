@@ -6,9 +6,17 @@ and data availability tracking.
 import logging
 import os
 from datetime import datetime, timedelta, time
-from typing import Dict, Optional, Tuple
+from time import monotonic
+from typing import Dict, Optional, Set, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from backend.redis_client import DataCache, redis_client
+except ImportError:
+    DataCache = redis_client = None
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +25,8 @@ DATA_LAG_DAYS = 31
 PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 DATA_DIRECTORY = os.path.join(PROJECT_ROOT, 'data')
 INTRADAY_DIRECTORY = os.path.join(PROJECT_ROOT, 'intraday_data')
+LAG_DATE_CACHE_SECONDS = 60
+AVAILABILITY_CACHE_TTL = 3600  # Shared (Redis) availability cache, in seconds
 
 
 def get_intraday_window(today: Optional[datetime] = None) -> Tuple[datetime, datetime]:
@@ -36,6 +46,51 @@ def get_intraday_window(today: Optional[datetime] = None) -> Tuple[datetime, dat
     return start_dt, end_dt
 
 
+def _iso_date(value) -> str:
+    """Format a date, datetime or Timestamp as YYYY-MM-DD without strftime's format parsing"""
+    return value.date().isoformat() if isinstance(value, datetime) else value.isoformat()[:10]
+
+
+def _parquet_date_range(file_path: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Read the first and last date of a parquet file from its footer statistics.
+    No data pages are decoded. Returns None when the file has no timestamp
+    date/index column or its row groups lack min/max statistics.
+    """
+    parquet_file = pq.ParquetFile(file_path)
+    schema = parquet_file.schema_arrow
+    index_columns = (schema.pandas_metadata or {}).get('index_columns', [])
+    candidates = [c for c in index_columns if isinstance(c, str)]
+    candidates += [name for name in schema.names if name.lower() == 'date']
+    
+    date_field = next(
+        (schema.field(name) for name in candidates
+         if pa.types.is_timestamp(schema.field(name).type) or pa.types.is_date(schema.field(name).type)),
+        None
+    )
+    if date_field is None:
+        return None
+    
+    column_index = schema.get_field_index(date_field.name)
+    metadata = parquet_file.metadata
+    mins, maxs = [], []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(column_index).statistics
+        if stats is None or not stats.has_min_max:
+            return None
+        mins.append(stats.min)
+        maxs.append(stats.max)
+    if not mins:
+        return None
+    
+    first_date, last_date = pd.Timestamp(min(mins)), pd.Timestamp(max(maxs))
+    tz = getattr(date_field.type, 'tz', None)
+    if tz:
+        # Statistics are reported in UTC; match the column's own timezone as pandas would
+        first_date, last_date = first_date.tz_convert(tz), last_date.tz_convert(tz)
+    return first_date, last_date
+
+
 class DataComplianceManager:
     """
     Manages SEBI compliance requirements for data handling.
@@ -47,15 +102,20 @@ class DataComplianceManager:
         self.data_dir = DATA_DIRECTORY
         self._cache_data_availability = None
         self._cache_timestamp = None
+        self._lag_date = None
+        self._lag_date_at = 0.0
         
     def get_current_date_with_lag(self) -> datetime:
         """
         Get the current effective date with 31-day lag applied.
         This ensures no data newer than 31 days is displayed.
         """
-        today = datetime.now()
-        lag_date = today - timedelta(days=self.data_lag_days)
-        return lag_date
+        # The lag is day-granular, so the value is reused for up to a minute
+        now = monotonic()
+        if self._lag_date is None or now - self._lag_date_at > LAG_DATE_CACHE_SECONDS:
+            self._lag_date = datetime.now() - timedelta(days=self.data_lag_days)
+            self._lag_date_at = now
+        return self._lag_date
     
     def check_data_availability(self) -> Dict:
         """
@@ -70,13 +130,16 @@ class DataComplianceManager:
         try:
             # Find any parquet file to check date range
             # All parquet files should have the same date range
+            # scandir's entries carry the file type from readdir, so no per-entry stat()
             sample_files = []
-            for letter_dir in os.listdir(self.data_dir):
-                letter_path = os.path.join(self.data_dir, letter_dir)
-                if os.path.isdir(letter_path):
-                    files = [f for f in os.listdir(letter_path) if f.endswith('.parquet')]
-                    if files:
-                        sample_files.append(os.path.join(letter_path, files[0]))
+            with os.scandir(self.data_dir) as letter_dirs:
+                for letter_dir in letter_dirs:
+                    if not letter_dir.is_dir():
+                        continue
+                    with os.scandir(letter_dir.path) as files:
+                        first_file = next((f.path for f in files if f.name.endswith('.parquet')), None)
+                    if first_file:
+                        sample_files.append(first_file)
                         if len(sample_files) >= 3:  # Check a few files to ensure consistency
                             break
             
@@ -86,24 +149,46 @@ class DataComplianceManager:
                     'message': 'No parquet data files found',
                     'last_date': None,
                     'first_date': None,
-                    'lag_date': self.get_current_date_with_lag().strftime('%Y-%m-%d'),
+                    'lag_date': _iso_date(self.get_current_date_with_lag()),
                     'days_lag': self.data_lag_days
                 }
             
-            # Read first file to get date range
-            df = pd.read_parquet(sample_files[0])
-            
-            # Ensure datetime index
-            if not isinstance(df.index, pd.DatetimeIndex):
-                date_col = next((c for c in df.columns if c.lower() == 'date'), None)
-                if date_col:
-                    df[date_col] = pd.to_datetime(df[date_col])
-                    df.set_index(date_col, inplace=True)
-                else:
-                    df.index = pd.to_datetime(df.index)
+            # Another worker may already have computed this for the same files and day
+            use_shared_cache = self._shared_cache_ready()
+            shared_key = self._availability_cache_key(sample_files)
+            shared_result = DataCache.get(shared_key) if use_shared_cache else None
+            if shared_result:
+                self._cache_data_availability = shared_result
+                self._cache_timestamp = datetime.now()
+                return shared_result
             
-            first_date = df.index.min()
-            last_date = df.index.max()
+            # Get the date range of the first file from its parquet footer statistics,
+            # falling back to reading the file when they are unavailable
+            date_range = _parquet_date_range(sample_files[0])
+            if date_range:
+                first_date, last_date = date_range
+            else:
+                # Decode only the date column (or just the stored index, when there is none)
+                schema = pq.read_schema(sample_files[0])
+                index_columns = {
+                    c for c in (schema.pandas_metadata or {}).get('index_columns', []) if isinstance(c, str)
+                }
+                date_col = next(
+                    (c for c in schema.names if c.lower() == 'date' and c not in index_columns), None
+                )
+                df = pd.read_parquet(sample_files[0], columns=[date_col] if date_col else [])
+                
+                # Ensure datetime index
+                if not isinstance(df.index, pd.DatetimeIndex):
+                    date_col = next((c for c in df.columns if c.lower() == 'date'), None)
+                    if date_col:
+                        df[date_col] = pd.to_datetime(df[date_col])
+                        df.set_index(date_col, inplace=True)
+                    else:
+                        df.index = pd.to_datetime(df.index)
+                
+                first_date = df.index.min()
+                last_date = df.index.max()
             lag_date = self.get_current_date_with_lag()
             
             # Check if we need to enforce additional lag
@@ -112,10 +197,10 @@ class DataComplianceManager:
             
             result = {
                 'available': True,
-                'first_date': first_date.strftime('%Y-%m-%d'),
-                'last_date': last_date.strftime('%Y-%m-%d'),
-                'lag_date': lag_date.strftime('%Y-%m-%d'),
-                'effective_last_date': effective_last_date.strftime('%Y-%m-%d'),
+                'first_date': _iso_date(first_date),
+                'last_date': _iso_date(last_date),
+                'lag_date': _iso_date(lag_date),
+                'effective_last_date': _iso_date(effective_last_date),
                 'days_lag': self.data_lag_days,
                 'needs_manual_lag': needs_manual_lag,
                 'total_days_available': (last_date - first_date).days,
@@ -125,6 +210,8 @@ class DataComplianceManager:
             
             self._cache_data_availability = result
             self._cache_timestamp = datetime.now()
+            if use_shared_cache:
+                DataCache.set(shared_key, result, ttl=AVAILABILITY_CACHE_TTL)
             
             return result
             
@@ -135,10 +222,25 @@ class DataComplianceManager:
                 'message': f'Error checking data: {str(e)}',
                 'last_date': None,
                 'first_date': None,
-                'lag_date': self.get_current_date_with_lag().strftime('%Y-%m-%d'),
+                'lag_date': _iso_date(self.get_current_date_with_lag()),
                 'days_lag': self.data_lag_days
             }
     
+    @staticmethod
+    def _shared_cache_ready() -> bool:
+        """Use Redis only once it is connected, so an outage never adds reconnect attempts here"""
+        return DataCache is not None and redis_client is not None and redis_client.has_connection
+    
+    def _availability_cache_key(self, sample_files) -> str:
+        """
+        Key for the availability result shared across workers via Redis.
+        File mtimes invalidate it when data is rewritten, and the lag date
+        when the day rolls over.
+        """
+        latest_mtime = max(os.path.getmtime(path) for path in sample_files)
+        lag_day = _iso_date(self.get_current_date_with_lag())
+        return f"compliance:availability:{self.data_dir}:{latest_mtime}:{lag_day}"
+    
     def _generate_availability_message(self, first_date: datetime, last_date: datetime, 
                                       lag_date: datetime, needs_manual_lag: bool) -> str:
         """Generate a user-friendly message about data availability."""
@@ -147,16 +249,16 @@ class DataComplianceManager:
         if needs_manual_lag:
             days_behind = (lag_date - last_date).days
             return (
-                f"📊 Data Range: {first_date.strftime('%Y-%m-%d')} to {last_date.strftime('%Y-%m-%d')} "
+                f"📊 Data Range: {_iso_date(first_date)} to {_iso_date(last_date)} "
                 f"({data_range} days)\n"
-                f"⏱️ SEBI Compliance: 31-day lag enforced (effective date: {lag_date.strftime('%Y-%m-%d')})\n"
+                f"⏱️ SEBI Compliance: 31-day lag enforced (effective date: {_iso_date(lag_date)})\n"
                 f"⚠️  Data is {days_behind} days behind the lag requirement"
             )
         else:
             return (
-                f"📊 Data Range: {first_date.strftime('%Y-%m-%d')} to {last_date.strftime('%Y-%m-%d')} "
+                f"📊 Data Range: {_iso_date(first_date)} to {_iso_date(last_date)} "
                 f"({data_range} days)\n"
-                f"✅ SEBI Compliance: 31-day lag active (effective date: {lag_date.strftime('%Y-%m-%d')})"
+                f"✅ SEBI Compliance: 31-day lag active (effective date: {_iso_date(lag_date)})"
             )
     
     def filter_data_with_lag(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -178,8 +280,12 @@ class DataComplianceManager:
         
         lag_date = self.get_current_date_with_lag()
         
-        # Filter to only include data up to lag date
-        filtered_df = df[df.index <= lag_date].copy()
+        # Filter to only include data up to lag date. A sorted index (the norm for
+        # these time series) is cut with a binary search instead of a full mask.
+        if df.index.is_monotonic_increasing:
+            filtered_df = df.iloc[:df.index.searchsorted(lag_date, side='right')]
+        else:
+            filtered_df = df[df.index <= lag_date].copy()
         
         if len(filtered_df) < len(df):
             logger.info(f"Applied {self.data_lag_days}-day lag: {len(df) - len(filtered_df)} rows excluded")
@@ -243,6 +349,11 @@ class DataComplianceManager:
 data_compliance = DataComplianceManager()
 
 
+# Parquet paths already found on disk. The updaters add and rewrite symbol files
+# but never delete them, so only symbols not seen yet need an exists() check.
+_known_parquet_paths: Set[str] = set()
+
+
 def get_parquet_path(symbol: str) -> Optional[str]:
     """Get the parquet file path for a symbol."""
     if not symbol or len(symbol) == 0:
@@ -251,7 +362,12 @@ def get_parquet_path(symbol: str) -> Optional[str]:
     if first_char.isdigit():
         first_char = '0-9'
     file_path = os.path.join(DATA_DIRECTORY, first_char, f"{symbol}.parquet")
-    return file_path if os.path.exists(file_path) else None
+    if file_path in _known_parquet_paths:
+        return file_path
+    if os.path.exists(file_path):
+        _known_parquet_paths.add(file_path)
+        return file_path
+    return None
 
 
 def get_intraday_parquet_path(symbol: str) -> Optional[str]:
@@ -286,7 +402,7 @@ def load_stock_data_with_compliance(symbol: str) -> Tuple[Optional[pd.DataFrame]
             'filtered_rows': len(filtered_df),
             'rows_excluded': len(df) - len(filtered_df),
             'lag_days': DATA_LAG_DAYS,
-            'effective_last_date': filtered_df.index.max().strftime('%Y-%m-%d') if not filtered_df.empty else None
+            'effective_last_date': _iso_date(filtered_df.index.max()) if not filtered_df.empty else None
         }
         
         return filtered_df, compliance_info
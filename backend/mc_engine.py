@@ -5,16 +5,26 @@ High-performance C++-powered simulation bridge for Python
 import hashlib
 import json
 import logging
+import os
 import pickle
-from dataclasses import asdict, dataclass
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on floats per simulation batch matrix (~8 MB), keeping memory flat for large runs
+_BATCH_MAX_ELEMENTS = 1_000_000
+
+# Simulations per method that keep an equity curve (only the first 100 are ever returned)
+_RETAINED_CURVES = 100
+
 
 @dataclass
 class Trade:
@@ -74,10 +84,54 @@ class SimulationResult:
         return result
 
 
+@dataclass
+class SimulationBatch:
+    """Struct-of-arrays results for a run of simulations (one array element per simulation)"""
+    final_value: np.ndarray
+    total_return_pct: np.ndarray
+    max_drawdown_pct: np.ndarray
+    num_trades: np.ndarray
+    win_rate: np.ndarray
+    sharpe_ratio: np.ndarray
+    # Equity curves for the leading simulations only (see _RETAINED_CURVES)
+    equity_curves: List[List[float]] = field(default_factory=list)
+    
+    @classmethod
+    def empty(cls, num_simulations: int = 0) -> 'SimulationBatch':
+        """Allocate arrays for num_simulations results"""
+        return cls(
+            final_value=np.empty(num_simulations),
+            total_return_pct=np.empty(num_simulations),
+            max_drawdown_pct=np.empty(num_simulations),
+            num_trades=np.empty(num_simulations, dtype=np.int64),
+            win_rate=np.empty(num_simulations),
+            sharpe_ratio=np.empty(num_simulations)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.final_value)
+    
+    def to_results(self, limit: Optional[int] = None) -> List[SimulationResult]:
+        """Materialize SimulationResult objects for the first `limit` simulations"""
+        count = len(self) if limit is None else min(limit, len(self))
+        return [
+            SimulationResult(
+                final_value=float(self.final_value[i]),
+                total_return_pct=float(self.total_return_pct[i]),
+                max_drawdown_pct=float(self.max_drawdown_pct[i]),
+                num_trades=int(self.num_trades[i]),
+                win_rate=float(self.win_rate[i]),
+                sharpe_ratio=float(self.sharpe_ratio[i]),
+                equity_curve=self.equity_curves[i] if i < len(self.equity_curves) else None
+            )
+            for i in range(count)
+        ]
+
+
 @dataclass
 class MonteCarloAnalysis:
     """Complete Monte Carlo analysis results"""
-    # Simulations
+    # Simulations (the first 100 materialized; see simulation_returns for all of them)
     simulations: List[SimulationResult]
     
     # Statistical metrics
@@ -123,6 +177,9 @@ class MonteCarloAnalysis:
     cvar_95: float  # Conditional VaR
     prob_ruin: float  # Probability of >50% loss
     
+    # Total return % of every simulation, sorted ascending
+    simulation_returns: np.ndarray = field(default_factory=lambda: np.empty(0), repr=False)
+    
     def to_dict(self) -> Dict:
         return {
             'simulations': [s.to_dict() for s in self.simulations[:100]],  # Limit sample size
@@ -171,6 +228,30 @@ class MonteCarloAnalysis:
         }
 
 
+def _sorted_percentiles(sorted_values: np.ndarray, percentiles: List[float]) -> np.ndarray:
+    """np.percentile (linear interpolation) for data that is already sorted ascending"""
+    positions = np.asarray(percentiles, dtype=np.float64) / 100 * (len(sorted_values) - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    fraction = positions - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def _sorted_histogram(sorted_values: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """np.histogram with equal-width bins for data that is already sorted ascending"""
+    if len(sorted_values) == 0:
+        low, high = 0.0, 1.0
+    else:
+        low, high = float(sorted_values[0]), float(sorted_values[-1])
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    bin_edges = np.linspace(low, high, bins + 1)
+    # Bins are half-open except the last, which also takes values equal to the top edge
+    boundaries = np.searchsorted(sorted_values, bin_edges[:-1], side='left')
+    counts = np.diff(boundaries, append=len(sorted_values))
+    return counts, bin_edges
+
+
 class MonteCarloEngine:
     """
     High-performance Monte Carlo simulation engine
@@ -185,158 +266,195 @@ class MonteCarloEngine:
             seed: Random seed for reproducibility (0 = auto-generate)
         """
         if seed is None or seed == 0:
-            seed = np.random.randint(0, 2**32 - 1)
+            seed = int(np.random.default_rng().integers(0, 2**32 - 1))
         self.seed = seed
-        self.rng = np.random.RandomState(seed)
-        self.trades: List[Trade] = []
+        self.rng = np.random.default_rng(seed)
+        # Trade P&L as fractions and win flags; the simulations read nothing else per trade
+        self.trade_pnls: np.ndarray = np.array([])
+        self.trade_wins: np.ndarray = np.array([], dtype=np.bool_)
         self.daily_returns: np.ndarray = np.array([])
         
     def set_trades(self, trades: List[Dict]):
         """Set trade data from backtest results"""
-        self.trades = [
-            Trade(
-                entry_price=t['entry_price'],
-                exit_price=t['exit_price'],
-                days_held=t.get('days_held', 0),
-                pnl_pct=t['pnl_pct'],
-                is_win=t.get('result', 'Loss') == 'Win'
-            )
-            for t in trades
-        ]
+        self.trade_pnls = np.fromiter(
+            (t['pnl_pct'] / 100.0 for t in trades), dtype=np.float64, count=len(trades)
+        )
+        self.trade_wins = np.fromiter(
+            (t.get('result', 'Loss') == 'Win' for t in trades), dtype=np.bool_, count=len(trades)
+        )
         
     def set_daily_returns(self, prices: pd.Series):
         """Set daily returns from price series"""
         self.daily_returns = prices.pct_change().dropna().values
         
     def _calculate_sharpe(self, equity_curve: np.ndarray) -> float:
-        """Calculate annualized Sharpe ratio"""
-        if len(equity_curve) < 2:
-            return 0.0
+        """Calculate annualized Sharpe ratio (per row when given a 2-D batch of curves)"""
+        if equity_curve.shape[-1] < 2:
+            return 0.0 if equity_curve.ndim == 1 else np.zeros(equity_curve.shape[0])
         
-        returns = np.diff(equity_curve) / equity_curve[:-1]
-        if len(returns) == 0 or np.std(returns) == 0:
-            return 0.0
-            
-        return (np.mean(returns) / np.std(returns)) * np.sqrt(252)
+        returns = np.diff(equity_curve, axis=-1) / equity_curve[..., :-1]
+        return self._sharpe_from_returns(returns)
+    
+    def _sharpe_from_returns(self, returns: np.ndarray) -> np.ndarray:
+        """Annualized Sharpe ratio of per-step returns along the last axis"""
+        std = np.std(returns, axis=-1)
+        sharpe = np.divide(np.mean(returns, axis=-1), std, out=np.zeros_like(std), where=std != 0)
+        return sharpe * np.sqrt(252)
     
     def _calculate_max_drawdown(self, equity_curve: np.ndarray) -> float:
-        """Calculate maximum drawdown percentage"""
-        if len(equity_curve) == 0:
+        """Calculate maximum drawdown percentage (per row when given a 2-D batch of curves)"""
+        if equity_curve.shape[-1] == 0:
             return 0.0
             
-        peak = np.maximum.accumulate(equity_curve)
-        drawdown = (peak - equity_curve) / peak
-        return np.max(drawdown) * 100
+        # Drawdown is 1 - value / running peak; the ratio is written over the peak
+        # buffer so only one temporary the size of the curves is allocated
+        ratio = np.maximum.accumulate(equity_curve, axis=-1)
+        np.divide(equity_curve, ratio, out=ratio)
+        return (1.0 - np.min(ratio, axis=-1)) * 100
+    
+    def _equity_curves(self, returns: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Compound a (simulations, steps) matrix of returns into equity curves starting at 100000
+        
+        `out` is an optional (>= simulations, steps + 1) buffer reused across batches; its
+        leading rows are overwritten and returned.
+        """
+        rows, steps = returns.shape
+        curves = np.empty((rows, steps + 1)) if out is None else out[:rows]
+        curves[:, 0] = 100000.0
+        growth = curves[:, 1:]
+        np.add(returns, 1.0, out=growth)
+        np.cumprod(growth, axis=1, out=growth)
+        growth *= 100000.0
+        return curves
     
-    def run_position_shuffle(self, num_simulations: int) -> List[SimulationResult]:
+    def _batch_rows(self, num_simulations: int, num_steps: int) -> int:
+        """Rows per batch that keep each matrix under _BATCH_MAX_ELEMENTS"""
+        return max(1, min(num_simulations, _BATCH_MAX_ELEMENTS // max(1, num_steps + 1)))
+    
+    def _batch_sizes(self, num_simulations: int, num_steps: int):
+        """Split simulations into row batches that keep each matrix under _BATCH_MAX_ELEMENTS"""
+        rows = self._batch_rows(num_simulations, num_steps)
+        for start in range(0, num_simulations, rows):
+            yield min(rows, num_simulations - start)
+    
+    def _simulate(self, returns: np.ndarray, num_trades: int, win_rates: Union[np.ndarray, float],
+                  out: SimulationBatch, start: int, curve_buffer: Optional[np.ndarray] = None):
+        """
+        Compound a (simulations, steps) matrix of returns and write the metrics of each row
+        into `out` from index `start`
+        
+        `curve_buffer` is passed through to _equity_curves so batches share one allocation.
+        Only the first _RETAINED_CURVES simulations keep an equity curve, downsampled to
+        ~100 points; the rest are never serialized (MonteCarloAnalysis.to_dict returns 100).
+        """
+        rows = slice(start, start + returns.shape[0])
+        curves = self._equity_curves(returns, curve_buffer)
+        out.final_value[rows] = curves[:, -1]
+        out.total_return_pct[rows] = (curves[:, -1] - 100000.0) / 100000.0 * 100
+        out.max_drawdown_pct[rows] = self._calculate_max_drawdown(curves)
+        out.num_trades[rows] = num_trades
+        out.win_rate[rows] = win_rates
+        # Each curve's step-to-step returns are exactly the sampled returns, so Sharpe
+        # is taken from them directly rather than re-deriving them from the curve
+        out.sharpe_ratio[rows] = self._sharpe_from_returns(returns)
+        
+        keep = _RETAINED_CURVES - start
+        if keep > 0:
+            curve_step = max(1, returns.shape[1] // 100)  # Sample for efficiency
+            out.equity_curves.extend(curve[::curve_step].tolist() for curve in curves[:keep])
+    
+    def run_position_shuffle(self, num_simulations: int,
+                             rng: Optional[np.random.Generator] = None) -> SimulationBatch:
         """
         Run position shuffle simulations
         Randomizes the order of trades while keeping the same P&L distribution
         """
-        if not self.trades:
-            return []
+        if len(self.trade_pnls) == 0:
+            return SimulationBatch.empty()
             
-        trade_pnls = np.array([t.pnl_pct / 100.0 for t in self.trades])
-        results = []
+        rng = rng or self.rng
+        trade_pnls = self.trade_pnls
+        n_trades = len(trade_pnls)
+        results = SimulationBatch.empty(num_simulations)
+        start = 0
         
-        for _ in range(num_simulations):
-            # Shuffle trade order
-            shuffled_pnls = self.rng.permutation(trade_pnls)
-            
-            # Simulate equity curve
-            equity_curve = np.zeros(len(shuffled_pnls) + 1)
-            equity_curve[0] = 100000.0
-            
-            for i, pnl in enumerate(shuffled_pnls):
-                equity_curve[i + 1] = equity_curve[i] * (1 + pnl)
-            
-            # Calculate metrics
-            wins = np.sum(shuffled_pnls > 0)
+        # Sample and curve buffers are allocated once and refilled for every batch
+        batch_rows = self._batch_rows(num_simulations, n_trades)
+        sample_buffer = np.empty((batch_rows, n_trades))
+        curve_buffer = np.empty((batch_rows, n_trades + 1))
+        
+        for rows in self._batch_sizes(num_simulations, n_trades):
+            # Shuffle trade order independently for each simulation (one row each)
+            shuffled_pnls = sample_buffer[:rows]
+            shuffled_pnls[:] = trade_pnls
+            rng.permuted(shuffled_pnls, axis=1, out=shuffled_pnls)
             
-            result = SimulationResult(
-                final_value=float(equity_curve[-1]),
-                total_return_pct=float((equity_curve[-1] - 100000.0) / 100000.0 * 100),
-                max_drawdown_pct=float(self._calculate_max_drawdown(equity_curve)),
-                num_trades=len(shuffled_pnls),
-                win_rate=float(wins / len(shuffled_pnls) * 100),
-                sharpe_ratio=float(self._calculate_sharpe(equity_curve)),
-                equity_curve=equity_curve.tolist()
-            )
-            results.append(result)
+            wins = np.count_nonzero(shuffled_pnls > 0, axis=1)
+            self._simulate(shuffled_pnls, n_trades, wins / n_trades * 100, results, start,
+                           curve_buffer)
+            start += rows
             
         return results
     
-    def run_return_permutation(self, num_simulations: int) -> List[SimulationResult]:
+    def run_return_permutation(self, num_simulations: int,
+                               rng: Optional[np.random.Generator] = None) -> SimulationBatch:
         """
         Run return permutation simulations
         Randomizes the order of daily returns
         """
         if len(self.daily_returns) == 0:
-            return []
+            return SimulationBatch.empty()
             
+        rng = rng or self.rng
         num_days = len(self.daily_returns)
-        results = []
+        results = SimulationBatch.empty(num_simulations)
+        start = 0
         
-        for _ in range(num_simulations):
-            # Permute daily returns
-            permuted_returns = self.rng.permutation(self.daily_returns)
-            
-            # Simulate equity curve
-            equity_curve = np.zeros(num_days + 1)
-            equity_curve[0] = 100000.0
-            
-            for i, ret in enumerate(permuted_returns):
-                equity_curve[i + 1] = equity_curve[i] * (1 + ret)
+        batch_rows = self._batch_rows(num_simulations, num_days)
+        sample_buffer = np.empty((batch_rows, num_days))
+        curve_buffer = np.empty((batch_rows, num_days + 1))
+        
+        for rows in self._batch_sizes(num_simulations, num_days):
+            # Permute daily returns independently for each simulation (one row each)
+            permuted_returns = sample_buffer[:rows]
+            permuted_returns[:] = self.daily_returns
+            rng.permuted(permuted_returns, axis=1, out=permuted_returns)
             
-            result = SimulationResult(
-                final_value=float(equity_curve[-1]),
-                total_return_pct=float((equity_curve[-1] - 100000.0) / 100000.0 * 100),
-                max_drawdown_pct=float(self._calculate_max_drawdown(equity_curve)),
-                num_trades=num_days // 20,  # Approximate
-                win_rate=50.0,  # Random walk
-                sharpe_ratio=float(self._calculate_sharpe(equity_curve)),
-                equity_curve=equity_curve[::max(1, num_days // 100)].tolist()  # Sample for efficiency
+            self._simulate(
+                permuted_returns,
+                num_days // 20,  # Approximate
+                50.0,  # Random walk
+                results, start, curve_buffer
             )
-            results.append(result)
+            start += rows
             
         return results
     
-    def run_bootstrap(self, num_simulations: int) -> List[SimulationResult]:
+    def run_bootstrap(self, num_simulations: int,
+                      rng: Optional[np.random.Generator] = None) -> SimulationBatch:
         """
         Run bootstrap simulations
         Samples trades with replacement
         """
-        if not self.trades:
-            return []
+        if len(self.trade_pnls) == 0:
+            return SimulationBatch.empty()
             
-        trade_pnls = np.array([t.pnl_pct / 100.0 for t in self.trades])
+        rng = rng or self.rng
+        trade_pnls = self.trade_pnls
         n_trades = len(trade_pnls)
-        results = []
+        results = SimulationBatch.empty(num_simulations)
+        start = 0
+        curve_buffer = np.empty((self._batch_rows(num_simulations, n_trades), n_trades + 1))
         
-        for _ in range(num_simulations):
-            # Bootstrap sample with replacement
-            bootstrapped_pnls = self.rng.choice(trade_pnls, size=n_trades, replace=True)
-            
-            # Simulate equity curve
-            equity_curve = np.zeros(n_trades + 1)
-            equity_curve[0] = 100000.0
-            
-            for i, pnl in enumerate(bootstrapped_pnls):
-                equity_curve[i + 1] = equity_curve[i] * (1 + pnl)
+        for rows in self._batch_sizes(num_simulations, n_trades):
+            # Bootstrap samples with replacement, one simulation per row
+            bootstrapped_pnls = rng.choice(trade_pnls, size=(rows, n_trades), replace=True)
             
-            # Calculate metrics
-            wins = np.sum(bootstrapped_pnls > 0)
-            
-            result = SimulationResult(
-                final_value=float(equity_curve[-1]),
-                total_return_pct=float((equity_curve[-1] - 100000.0) / 100000.0 * 100),
-                max_drawdown_pct=float(self._calculate_max_drawdown(equity_curve)),
-                num_trades=n_trades,
-                win_rate=float(wins / n_trades * 100),
-                sharpe_ratio=float(self._calculate_sharpe(equity_curve)),
-                equity_curve=equity_curve.tolist()
-            )
-            results.append(result)
+            wins = np.count_nonzero(bootstrapped_pnls > 0, axis=1)
+            self._simulate(bootstrapped_pnls, n_trades, wins / n_trades * 100, results, start,
+                           curve_buffer)
+            start += rows
             
         return results
     
@@ -349,22 +467,37 @@ class MonteCarloEngine:
         # Divide simulations between methods
         n_per_method = config.num_simulations // 3
         
-        # Run all three simulation types
-        shuffle_results = self.run_position_shuffle(n_per_method)
-        perm_results = self.run_return_permutation(n_per_method)
-        bootstrap_results = self.run_bootstrap(n_per_method)
+        # Run all three simulation types concurrently; NumPy releases the GIL for the
+        # bulk array work. Each method draws from its own child generator, so
+        # results stay reproducible for a seed regardless of thread scheduling.
+        shuffle_rng, perm_rng, bootstrap_rng = self.rng.spawn(3)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            shuffle_future = executor.submit(self.run_position_shuffle, n_per_method, shuffle_rng)
+            perm_future = executor.submit(self.run_return_permutation, n_per_method, perm_rng)
+            bootstrap_future = executor.submit(self.run_bootstrap, n_per_method, bootstrap_rng)
+            shuffle_results = shuffle_future.result()
+            perm_results = perm_future.result()
+            bootstrap_results = bootstrap_future.result()
         
         # Combine results
-        all_simulations = shuffle_results + perm_results + bootstrap_results
+        batches = (shuffle_results, perm_results, bootstrap_results)
+        num_trials = sum(len(batch) for batch in batches)
+        
+        # Only the first 100 simulations are returned, so only those become objects
+        sample_simulations = []
+        for batch in batches:
+            sample_simulations.extend(batch.to_results(limit=100 - len(sample_simulations)))
         
-        # Extract return values for analysis
-        returns = np.array([sim.total_return_pct for sim in all_simulations])
+        # Extract return values for analysis, sorted once so percentiles and tail
+        # metrics below are index lookups and binary searches
+        returns = np.concatenate([batch.total_return_pct for batch in batches])
+        returns.sort()
         
         # Calculate percentiles
-        percentiles = np.percentile(returns, [5, 25, 50, 75, 95])
+        percentiles = _sorted_percentiles(returns, [5, 25, 50, 75, 95])
         
-        # Build histogram (20 bins)
-        hist, bin_edges = np.histogram(returns, bins=20)
+        # Build histogram (20 bins) from bin-edge positions in the sorted returns
+        hist, bin_edges = _sorted_histogram(returns, 20)
         
         # Calculate confidence intervals
         ci_lower = percentiles[0]  # 5th percentile
@@ -372,13 +505,14 @@ class MonteCarloEngine:
         
         # Calculate means
         mean_return = np.mean(returns)
-        mean_sharpe = np.mean([sim.sharpe_ratio for sim in all_simulations])
-        mean_max_dd = np.mean([sim.max_drawdown_pct for sim in all_simulations])
+        mean_sharpe = np.mean(np.concatenate([batch.sharpe_ratio for batch in batches]))
+        mean_max_dd = np.mean(np.concatenate([batch.max_drawdown_pct for batch in batches]))
         
         # Risk metrics
         var_95 = percentiles[0]  # 5th percentile = 95% VaR
-        cvar_95 = np.mean(returns[returns <= var_95]) if np.any(returns <= var_95) else var_95
-        prob_ruin = np.mean(returns < -50.0) * 100  # Probability of >50% loss
+        tail_count = np.searchsorted(returns, var_95, side='right')
+        cvar_95 = np.mean(returns[:tail_count]) if tail_count else var_95
+        prob_ruin = np.searchsorted(returns, -50.0, side='left') / len(returns) * 100  # Probability of >50% loss
         
         # Determine interpretation
         # For now, use placeholder original metrics
@@ -388,7 +522,7 @@ class MonteCarloEngine:
         
         # Create result
         analysis = MonteCarloAnalysis(
-            simulations=all_simulations,
+            simulations=sample_simulations,
             p_value_strategy_vs_random=0.0,  # Calculated later
             p_value_strategy_vs_bootstrap=0.0,
             percentile_5=float(percentiles[0]),
@@ -405,7 +539,7 @@ class MonteCarloEngine:
             distribution_min=float(bin_edges[0]),
             distribution_max=float(bin_edges[-1]),
             seed_used=self.seed,
-            num_trials=len(all_simulations),
+            num_trials=num_trials,
             mean_return=float(mean_return),
             mean_sharpe=float(mean_sharpe),
             mean_max_drawdown=float(mean_max_dd),
@@ -413,10 +547,11 @@ class MonteCarloEngine:
             risk_rating="",
             var_95=float(var_95),
             cvar_95=float(cvar_95),
-            prob_ruin=float(prob_ruin)
+            prob_ruin=float(prob_ruin),
+            simulation_returns=returns
         )
         
-        logger.info(f"Monte Carlo analysis complete: {len(all_simulations)} simulations")
+        logger.info(f"Monte Carlo analysis complete: {num_trials} simulations")
         return analysis
     
     def calculate_p_values(self, analysis: MonteCarloAnalysis, 
@@ -424,10 +559,10 @@ class MonteCarloEngine:
                           original_sharpe: float) -> MonteCarloAnalysis:
         """Calculate p-values and update interpretation"""
         
-        returns = np.array([sim.total_return_pct for sim in analysis.simulations])
+        returns = analysis.simulation_returns
         
         # Calculate p-value (what % of simulations beat the original strategy?)
-        p_value = np.mean(returns >= original_return) * 100
+        p_value = (len(returns) - np.searchsorted(returns, original_return, side='left')) / len(returns) * 100
         
         analysis.original_return = original_return
         analysis.original_sharpe = original_sharpe
@@ -470,25 +605,90 @@ class SimulationCache:
     def __init__(self, cache_dir: str = "./cache"):
         self.cache_dir = cache_dir
         
-    def _get_cache_key(self, trades: List[Dict], config: SimulationConfig) -> str:
-        """Generate cache key from trades and config"""
-        data = json.dumps({
-            'trades': trades,
-            'config': config.to_dict()
-        }, sort_keys=True)
-        return hashlib.md5(data.encode()).hexdigest()
+    def _get_cache_key(self, trades: List[Dict], daily_returns: np.ndarray,
+                       config: SimulationConfig) -> str:
+        """Generate cache key from trade P&Ls, daily returns and config (the inputs the simulations read)"""
+        pnls = np.fromiter((t['pnl_pct'] for t in trades), dtype=np.float64, count=len(trades))
+        returns = np.ascontiguousarray(daily_returns, dtype=np.float64)
+        digest = hashlib.blake2b(struct.pack('<QQ', len(pnls), len(returns)), digest_size=16)
+        digest.update(pnls.tobytes())
+        digest.update(returns.tobytes())
+        # Integers go in as text so any seed (negative or wider than 64 bits) hashes
+        digest.update(f"{config.num_simulations}:{config.seed}".encode())
+        digest.update(struct.pack(
+            '<dddd',
+            config.initial_capital,
+            config.risk_per_trade,
+            config.atr_multiplier,
+            config.tax_rate
+        ))
+        return digest.hexdigest()
     
-    def get(self, trades: List[Dict], config: SimulationConfig) -> Optional[MonteCarloAnalysis]:
+    def _paths(self, key: str) -> Tuple[str, str]:
+        """Arrow file holding the simulation returns and the JSON sidecar for everything else"""
+        base = os.path.join(self.cache_dir, key)
+        return base + '.arrow', base + '.json'
+    
+    def get(self, trades: List[Dict], daily_returns: np.ndarray,
+            config: SimulationConfig) -> Optional[MonteCarloAnalysis]:
         """Retrieve cached result if available"""
-        key = self._get_cache_key(trades, config)
-        # In production, use Redis or file-based cache
-        return None
+        try:
+            arrow_path, json_path = self._paths(self._get_cache_key(trades, daily_returns, config))
+        except (KeyError, TypeError, ValueError, struct.error) as e:
+            logger.warning(f"Cannot build simulation cache key: {e}")
+            return None
+        if not (os.path.exists(arrow_path) and os.path.exists(json_path)):
+            return None
+        
+        try:
+            with open(json_path, 'r') as f:
+                summary = json.load(f)
+            with pa.OSFile(arrow_path, 'rb') as source:
+                table = pa.ipc.open_file(source).read_all()
+            returns = table.column('returns').to_numpy()
+        except (OSError, ValueError, KeyError, pa.ArrowException) as e:
+            logger.warning(f"Ignoring unreadable simulation cache entry {json_path}: {e}")
+            return None
+        
+        summary['simulations'] = [SimulationResult(**s) for s in summary['simulations']]
+        return MonteCarloAnalysis(**summary, simulation_returns=returns)
     
-    def set(self, trades: List[Dict], config: SimulationConfig, result: MonteCarloAnalysis):
+    def set(self, trades: List[Dict], daily_returns: np.ndarray, config: SimulationConfig,
+            result: MonteCarloAnalysis):
         """Cache simulation result"""
-        key = self._get_cache_key(trades, config)
-        # In production, store in Redis or file
-        pass
+        try:
+            arrow_path, json_path = self._paths(self._get_cache_key(trades, daily_returns, config))
+        except (KeyError, TypeError, ValueError, struct.error) as e:
+            logger.warning(f"Cannot build simulation cache key: {e}")
+            return
+        # The (up to num_simulations * 3) returns go in one contiguous Arrow buffer;
+        # the scalar fields and the 100 sample simulations are small enough for JSON
+        summary = {
+            f.name: getattr(result, f.name)
+            for f in fields(MonteCarloAnalysis)
+            if f.name not in ('simulations', 'simulation_returns')
+        }
+        summary['simulations'] = [asdict(s) for s in result.simulations]
+        batch = pa.record_batch({'returns': pa.array(result.simulation_returns, type=pa.float64())})
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with pa.OSFile(arrow_path + '.tmp', 'wb') as sink:
+                with pa.ipc.new_file(sink, batch.schema) as writer:
+                    writer.write_batch(batch)
+            with open(json_path + '.tmp', 'w') as f:
+                json.dump(summary, f, default=_json_default)
+            os.replace(arrow_path + '.tmp', arrow_path)
+            os.replace(json_path + '.tmp', json_path)
+        except (OSError, TypeError, pa.ArrowException) as e:
+            logger.warning(f"Failed to write simulation cache entry {json_path}: {e}")
+
+
+def _json_default(value):
+    """Convert NumPy scalars and arrays left in analysis fields to JSON types"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
 
 
 # Global cache instance
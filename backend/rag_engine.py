@@ -6,18 +6,27 @@ NOTE: Upstash REST client does NOT support RediSearch (FT.CREATE, FT.SEARCH)
 or low-level Redis commands (execute_command, scan_iter, hset with bytes).
 This engine uses a pure-Python cosine similarity approach instead, storing
 document embeddings as JSON and performing similarity search in application code.
+Embeddings live in vec:{id} apart from the content in doc:{id}. Each process keeps
+a parsed copy of the vectors and rescans Redis only when the index version counter
+(bumped on every write) changes; content is fetched for the matches only.
 """
-import json
+import base64
 import logging
 import math
 import os
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from backend.redis_client import RedisConfig, redis_client
+from backend.redis_client import (EmbeddingCache, RedisConfig, dump_json, load_json, redis_client,
+                                  scan_keys, unlink_keys)
 
 logger = logging.getLogger(__name__)
 
+# Fixed framing of the assemble_context block (parts are joined without a separator)
+_CONTEXT_HEADER = "\n=== RELEVANT KNOWLEDGE BASE ===\n\n"
+_CONTEXT_FOOTER = "=== END KNOWLEDGE BASE ===\n"
+
 # Try lightweight embedding libraries in order of preference
 EMBEDDING_BACKEND = None
 
@@ -77,6 +86,66 @@ def _cosine_similarity(vec_a: List[float], vec_b: List[float]) -> float:
     return dot / (norm_a * norm_b)
 
 
+def _key_id(key) -> str:
+    """Document id of a doc:{id} or vec:{id} key (str from Upstash, bytes from redis-py)"""
+    key = key if isinstance(key, str) else key.decode()
+    return key.partition(':')[2]
+
+
+def _encode_embedding(embedding: List[float], quant: str) -> Dict[str, Any]:
+    """
+    Document fields holding an embedding at the configured precision.
+    fp16 and int8 are stored as base64 of the packed array (int8 with a
+    symmetric scale), 2x/4x smaller than FP32 and far smaller than a JSON list.
+    """
+    if quant not in ('fp16', 'int8') or not NUMPY_AVAILABLE:
+        return {"embedding": embedding}
+    
+    arr = np.asarray(embedding, dtype=np.float32)
+    if quant == 'fp16':
+        return {"embedding_f16": base64.b64encode(arr.astype(np.float16).tobytes()).decode('ascii')}
+    
+    scale = float(np.abs(arr).max()) / 127 or 1.0
+    quantized = np.clip(np.round(arr / scale), -128, 127).astype(np.int8)
+    return {
+        "embedding_i8": base64.b64encode(quantized.tobytes()).decode('ascii'),
+        "embedding_scale": scale
+    }
+
+
+def _decode_embedding(doc_data: Dict) -> Optional[List[float]]:
+    """Read back an embedding written by _encode_embedding at any precision"""
+    if doc_data.get('embedding'):
+        return doc_data['embedding']
+    if doc_data.get('embedding_f16'):
+        packed = base64.b64decode(doc_data['embedding_f16'])
+        return np.frombuffer(packed, dtype=np.float16).astype(np.float32).tolist()
+    if doc_data.get('embedding_i8'):
+        packed = base64.b64decode(doc_data['embedding_i8'])
+        arr = np.frombuffer(packed, dtype=np.int8).astype(np.float32)
+        return (arr * doc_data.get('embedding_scale', 1.0)).tolist()
+    return None
+
+
+def _normalized_matrix(embeddings: List[List[float]]) -> Optional["np.ndarray"]:
+    """
+    Stack embeddings into a float32 matrix of unit rows, so cosine similarity
+    against every document is a single matrix-vector product.
+    Returns None without NumPy or when the embeddings differ in dimension.
+    """
+    if not NUMPY_AVAILABLE or not embeddings:
+        return None
+    try:
+        matrix = np.array(embeddings, dtype=np.float32)
+    except ValueError:
+        return None
+    if matrix.ndim != 2:
+        return None
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms != 0)
+    return matrix
+
+
 class RAGEngine:
     """
     Retrieval-Augmented Generation Engine
@@ -91,6 +160,66 @@ class RAGEngine:
         self.index_name = RedisConfig.VECTOR_INDEX_NAME
         self.vector_dim = RedisConfig.VECTOR_DIM
         self.similarity_threshold = RedisConfig.SIMILARITY_THRESHOLD
+        self.vector_quant = RedisConfig.VECTOR_QUANT
+        # In-process copy of the indexed documents, reloaded only when the
+        # Redis-side version counter changes (see _load_index)
+        self._version_key = f"{self.index_name}:version"
+        self._index_version = None
+        # (documents, normalized embedding matrix), swapped as one tuple so
+        # concurrent searches never pair documents with another load's matrix
+        self._index: Tuple[List[Dict], Any] = ([], None)
+        # Per-thread float32 query vector, reused across searches
+        self._local = threading.local()
+        # Optional PCA (mean, components) applied to stored and query embeddings
+        self._pca = self._load_pca(RedisConfig.VECTOR_PCA_PATH)
+        if self._pca is not None:
+            self.vector_dim = self._pca[1].shape[0]
+    
+    @staticmethod
+    def _load_pca(path: Optional[str]):
+        """Load a projection saved by fit_pca, or None if unset/unavailable"""
+        if not path or not NUMPY_AVAILABLE or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return data['mean'].astype(np.float32), data['components'].astype(np.float32)
+        except Exception as e:
+            logger.error(f"❌ Failed to load PCA projection {path}: {e}")
+            return None
+    
+    def _project(self, embedding: List[float]) -> List[float]:
+        """Reduce an embedding with the PCA projection, if one is configured"""
+        if self._pca is None:
+            return embedding
+        mean, components = self._pca
+        if len(embedding) != mean.shape[0]:
+            # Already projected, or from a model the projection was not fit on
+            return embedding
+        return (components @ (np.asarray(embedding, dtype=np.float32) - mean)).tolist()
+    
+    def fit_pca(self, n_components: int, path: str) -> bool:
+        """
+        Fit a PCA projection to the indexed (unprojected) embeddings and save it to `path`.
+        To use it, set VECTOR_PCA_PATH to `path` and re-index: stored vectors are only
+        reduced when written.
+        """
+        if not NUMPY_AVAILABLE:
+            return False
+        client = redis_client.get_client()
+        if not client:
+            return False
+        
+        docs, _ = self._load_index(client)
+        embeddings = np.array([d['embedding'] for d in docs], dtype=np.float32)
+        if embeddings.ndim != 2 or len(embeddings) < n_components:
+            logger.warning(f"Need at least {n_components} indexed documents to fit PCA")
+            return False
+        
+        mean = embeddings.mean(axis=0)
+        _, _, components = np.linalg.svd(embeddings - mean, full_matrices=False)
+        np.savez(path, mean=mean, components=components[:n_components])
+        logger.info(f"✅ Saved {embeddings.shape[1]}->{n_components} PCA projection to {path}")
+        return True
         
     def _load_model(self):
         """Lazy load the embedding model"""
@@ -117,11 +246,18 @@ class RAGEngine:
             logger.info(f"Loading embedding model (backend: {self.backend})...")
             
             if self.backend == 'fastembed':
-                # FastEmbed - lightweight, no PyTorch
-                self.model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+                # FastEmbed - lightweight, no PyTorch; ONNX Runtime on CPU
+                self.model = TextEmbedding(
+                    model_name="BAAI/bge-small-en-v1.5",
+                    cache_dir=RedisConfig.EMBEDDING_MODEL_CACHE,
+                    threads=RedisConfig.EMBEDDING_THREADS,
+                    providers=["CPUExecutionProvider"]
+                )
                 logger.info("✅ FastEmbed model loaded successfully")
             elif self.backend == 'sentence_transformers':
                 # sentence-transformers - heavy fallback
+                import torch
+                torch.set_num_threads(RedisConfig.EMBEDDING_THREADS)
                 self.model = SentenceTransformer('all-MiniLM-L6-v2')
                 logger.info("✅ SentenceTransformer model loaded successfully")
                 
@@ -166,8 +302,50 @@ class RAGEngine:
             logger.error(f"Error generating embedding: {e}")
             return None
     
+    def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for several texts with one model call per batch.
+        Entries are None where embedding failed.
+        """
+        self._load_model()
+        if not self.model:
+            logger.error("Embedding model not available")
+            return [None] * len(texts)
+        
+        try:
+            if self.backend == 'gemini':
+                client = google_genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
+                embeddings = []
+                for start in range(0, len(texts), 100):  # API limit per request
+                    response = client.models.embed_content(
+                        model='gemini-embedding-001',
+                        contents=texts[start:start + 100],
+                    )
+                    embeddings.extend(list(e.values) for e in response.embeddings)
+                return embeddings
+            elif self.backend == 'fastembed':
+                return [e.tolist() for e in self.model.embed(texts, batch_size=RedisConfig.EMBEDDING_BATCH_SIZE)]
+            elif self.backend == 'sentence_transformers':
+                return self.model.encode(
+                    texts, batch_size=RedisConfig.EMBEDDING_BATCH_SIZE, convert_to_tensor=False
+                ).tolist()
+        except Exception as e:
+            logger.error(f"Error generating batch embeddings, embedding one at a time: {e}")
+        
+        return [self.embed_text(text) for text in texts]
+    
     def embed_query(self, query: str) -> Optional[List[float]]:
-        """Generate embedding vector for a query"""
+        """Generate embedding vector for a query, reusing a cached one for repeated queries"""
+        namespace = f"{self.backend}:q"
+        embedding = EmbeddingCache.get(query, namespace)
+        if embedding is None:
+            embedding = self._embed_query_uncached(query)
+            if embedding:
+                EmbeddingCache.set(query, namespace, embedding)
+        return embedding
+    
+    def _embed_query_uncached(self, query: str) -> Optional[List[float]]:
+        """Run the model on a query"""
         self._load_model()
         if self.backend == 'gemini':
             try:
@@ -216,12 +394,38 @@ class RAGEngine:
             logger.error(f"❌ Error verifying Redis for RAG: {e}")
             return False
     
+    def _write_document(self, pipe, doc_id: str, content: str, embedding: List[float],
+                        title: str = "", category: str = "general", tags: List[str] = None,
+                        metadata: Dict = None):
+        """
+        Queue the two stored records of a document on `pipe`:
+        doc:{id} holds content and metadata, vec:{id} holds the embedding plus the
+        title/category shown in results, so loading the index never pulls content.
+        """
+        # Store as JSON (Upstash REST compatible — no raw bytes)
+        doc_data = {
+            "content": content,
+            "title": title or doc_id,
+            "category": category,
+            "tags": ",".join(tags) if tags else "",
+        }
+        if metadata:
+            doc_data["metadata"] = metadata
+        
+        vec_data = {
+            "title": title or doc_id,
+            "category": category,
+            **_encode_embedding(self._project(embedding), self.vector_quant),
+        }
+        pipe.set(f"doc:{doc_id}", dump_json(doc_data))
+        pipe.set(f"vec:{doc_id}", dump_json(vec_data))
+    
     def add_document(self, doc_id: str, content: str, title: str = "", 
                      category: str = "general", tags: List[str] = None,
                      metadata: Dict = None):
         """
         Add a document to the vector index.
-        Stores embedding as a JSON list (compatible with Upstash REST).
+        Stores content and embedding as JSON records (compatible with Upstash REST).
         """
         if not self.backend:
             logger.warning("Cannot add document: no embedding backend available")
@@ -237,21 +441,11 @@ class RAGEngine:
             if not embedding:
                 return False
             
-            # Store as JSON (Upstash REST compatible — no raw bytes)
-            doc_key = f"doc:{doc_id}"
-            doc_data = {
-                "content": content,
-                "title": title or doc_id,
-                "category": category,
-                "tags": ",".join(tags) if tags else "",
-                "embedding": embedding,  # stored as JSON list
-            }
-            
-            if metadata:
-                doc_data["metadata"] = metadata
-            
-            # Store the whole document as a single JSON string
-            client.set(doc_key, json.dumps(doc_data))
+            pipe = self._pipeline(client)
+            self._write_document(pipe, doc_id, content, embedding, title, category, tags, metadata)
+            if pipe is not client:
+                pipe.execute()
+            self._bump_version(client)
             logger.debug(f"Document indexed: {doc_id}")
             return True
             
@@ -259,30 +453,167 @@ class RAGEngine:
             logger.error(f"Error adding document {doc_id}: {e}")
             return False
     
-    def _get_all_doc_keys(self, client) -> List[str]:
-        """Get all document keys, compatible with both standard Redis and Upstash REST."""
+    def add_documents(self, docs: List[Dict]) -> int:
+        """
+        Add several documents at once: documents are embedded in batches of
+        RedisConfig.EMBEDDING_BATCH_SIZE, each followed by one pipelined write.
+        
+        Each dict takes the add_document arguments ('id', 'content' and optionally
+        'title', 'category', 'tags', 'metadata'). Returns the number indexed.
+        """
+        if not self.backend:
+            logger.warning("Cannot add documents: no embedding backend available")
+            return 0
+        if not docs:
+            return 0
+            
         try:
-            # Try scan_iter first (standard redis-py)
-            if hasattr(client, 'scan_iter'):
-                return list(client.scan_iter(match="doc:*", count=100))
+            client = redis_client.get_client()
+            if not client:
+                return 0
+            
+            batch_size = max(1, RedisConfig.EMBEDDING_BATCH_SIZE)
+            indexed = 0
+            for start in range(0, len(docs), batch_size):
+                batch = docs[start:start + batch_size]
+                embeddings = self.embed_texts([d.get('content', '') for d in batch])
+                
+                pipe = self._pipeline(client)
+                for doc, embedding in zip(batch, embeddings):
+                    if not embedding:
+                        logger.warning(f"Skipping document {doc.get('id')}: no embedding")
+                        continue
+                    self._write_document(
+                        pipe, doc['id'], doc.get('content', ''), embedding, doc.get('title', ''),
+                        doc.get('category', 'general'), doc.get('tags'), doc.get('metadata')
+                    )
+                    indexed += 1
+                if pipe is not client:
+                    pipe.execute()
+            
+            self._bump_version(client)
+            logger.debug(f"Indexed {indexed}/{len(docs)} documents")
+            return indexed
             
-            # Fallback: use SCAN command via Upstash REST
-            keys = []
-            cursor = 0
-            while True:
-                result = client.scan(cursor, match="doc:*", count=100)
-                cursor, batch = result
-                keys.extend(batch)
-                if cursor == 0:
-                    break
-            return keys
+        except Exception as e:
+            logger.error(f"Error adding documents: {e}")
+            return 0
+    
+    @staticmethod
+    def _pipeline(client):
+        """A non-transactional pipeline, or the client itself if it cannot pipeline"""
+        if not hasattr(client, 'pipeline'):
+            return client
+        try:
+            return client.pipeline(transaction=False)
+        except TypeError:
+            # upstash-redis pipelines take no transaction flag
+            return client.pipeline()
+    
+    def _get_all_doc_keys(self, client, pattern: str = "doc:*") -> List[str]:
+        """Get all document keys, compatible with both standard Redis and Upstash REST."""
+        try:
+            return scan_keys(client, pattern)
         except Exception as e:
             logger.error(f"Error scanning doc keys: {e}")
             return []
 
+    def _bump_version(self, client):
+        """Mark the index as changed so every process reloads it on its next search"""
+        try:
+            client.incr(self._version_key)
+        except Exception as e:
+            logger.warning(f"Could not bump RAG index version: {e}")
+        self._index_version = None
+    
+    def _load_index(self, client) -> Tuple[List[Dict], Any]:
+        """
+        Return the parsed vector records and their normalized embedding matrix,
+        scanning Redis only when the index version changed.
+        Records are fetched with MGET in chunks rather than one GET per key.
+        """
+        version = client.get(self._version_key)
+        if version is not None and version == self._index_version:
+            return self._index
+        
+        # Documents indexed before vectors were split out keep the embedding
+        # (and content) in doc:{id}; read those for every doc:* with no vec:* record
+        doc_keys = self._get_all_doc_keys(client, "vec:*")
+        vec_ids = {_key_id(k) for k in doc_keys}
+        doc_keys += [k for k in self._get_all_doc_keys(client) if _key_id(k) not in vec_ids]
+        docs = []
+        for start in range(0, len(doc_keys), 500):
+            chunk = doc_keys[start:start + 500]
+            for key, raw in zip(chunk, client.mget(*chunk)):
+                try:
+                    if not raw:
+                        continue
+                    doc_data = load_json(raw)  # str (Upstash REST) or bytes (redis-py)
+                    embedding = _decode_embedding(doc_data)
+                    if not embedding:
+                        continue
+                    doc = {
+                        'id': _key_id(key),
+                        'title': doc_data.get('title', ''),
+                        'category': doc_data.get('category', 'general'),
+                        'embedding': embedding
+                    }
+                    if 'content' in doc_data:
+                        doc['content'] = doc_data['content']
+                    docs.append(doc)
+                except Exception as e:
+                    logger.debug(f"Error processing doc {key}: {e}")
+        
+        # Documents written before the version counter existed are never cached,
+        # so they are rescanned until the next add/delete/clear creates the counter
+        self._index = (docs, _normalized_matrix([d['embedding'] for d in docs]))
+        self._index_version = version
+        return self._index
+    
+    def _rank(self, query_embedding: List[float], docs: List[Dict], matrix,
+              top_k: int) -> List[Tuple[int, float]]:
+        """(index, similarity) of the best top_k documents above the threshold"""
+        if matrix is None or matrix.shape[1] != len(query_embedding):
+            # Pure-Python fallback (no NumPy, or mixed embedding dimensions)
+            scored = [
+                (i, _cosine_similarity(query_embedding, doc['embedding']))
+                for i, doc in enumerate(docs)
+            ]
+            scored = [item for item in scored if item[1] >= self.similarity_threshold]
+            scored.sort(key=lambda item: item[1], reverse=True)
+            return scored[:top_k]
+        
+        query_vec = getattr(self._local, 'query_buf', None)
+        if query_vec is None or query_vec.shape[0] != matrix.shape[1]:
+            query_vec = self._local.query_buf = np.empty(matrix.shape[1], dtype=np.float32)
+        query_vec[:] = query_embedding
+        norm = np.linalg.norm(query_vec)
+        if norm == 0:
+            return []
+        query_vec /= norm
+        scores = matrix @ query_vec
+        
+        # Apply the threshold before selecting top_k, so miss-heavy queries
+        # stop here and only passing documents are partitioned and sorted
+        candidates = np.flatnonzero(scores >= self.similarity_threshold)
+        if top_k < len(candidates):
+            candidates = candidates[np.argpartition(scores[candidates], -top_k)[-top_k:]]
+        candidates = candidates[np.argsort(scores[candidates])[::-1]]
+        return [(int(i), float(scores[i])) for i in candidates]
+    
+    def _fetch_contents(self, client, docs: List[Dict]) -> Dict[str, str]:
+        """Content of the given documents from doc:{id}, in one MGET"""
+        if not docs:
+            return {}
+        contents = {}
+        for doc, raw in zip(docs, client.mget(*(f"doc:{d['id']}" for d in docs))):
+            if raw:
+                contents[doc['id']] = load_json(raw).get('content', '')
+        return contents
+    
     def search(self, query: str, top_k: int = 3) -> List[Dict]:
         """
-        Search for similar documents using pure-Python cosine similarity.
+        Search for similar documents by cosine similarity against the loaded index.
         Returns list of documents with similarity scores.
         """
         if not self.backend:
@@ -299,44 +630,25 @@ class RAGEngine:
             query_embedding = self.embed_query(query)
             if not query_embedding:
                 return []
+            query_embedding = self._project(query_embedding)
             
-            # Get all document keys
-            doc_keys = self._get_all_doc_keys(client)
-            
-            if not doc_keys:
+            docs, matrix = self._load_index(client)
+            if not docs:
                 logger.debug("No documents in index")
                 return []
             
-            # Score each document
-            scored_docs = []
-            for key in doc_keys:
-                try:
-                    raw = client.get(key)
-                    if not raw:
-                        continue
-                    
-                    doc_data = json.loads(raw) if isinstance(raw, str) else json.loads(raw.decode())
-                    doc_embedding = doc_data.get('embedding')
-                    if not doc_embedding:
-                        continue
-                    
-                    similarity = _cosine_similarity(query_embedding, doc_embedding)
-                    
-                    if similarity >= self.similarity_threshold:
-                        scored_docs.append({
-                            'id': key.replace('doc:', '') if isinstance(key, str) else key.decode().replace('doc:', ''),
-                            'content': doc_data.get('content', ''),
-                            'title': doc_data.get('title', ''),
-                            'category': doc_data.get('category', 'general'),
-                            'similarity': similarity
-                        })
-                except Exception as e:
-                    logger.debug(f"Error processing doc {key}: {e}")
-                    continue
+            hits = [(docs[i], similarity) for i, similarity in self._rank(query_embedding, docs, matrix, top_k)]
+            contents = self._fetch_contents(client, [doc for doc, _ in hits if 'content' not in doc])
             
-            # Sort by similarity descending, take top_k
-            scored_docs.sort(key=lambda d: d['similarity'], reverse=True)
-            results = scored_docs[:top_k]
+            results = []
+            for doc, similarity in hits:
+                results.append({
+                    'id': doc['id'],
+                    'content': doc.get('content', contents.get(doc['id'], '')),
+                    'title': doc['title'],
+                    'category': doc['category'],
+                    'similarity': similarity
+                })
             
             logger.debug(f"Search found {len(results)} relevant documents")
             return results
@@ -350,16 +662,14 @@ class RAGEngine:
         if not retrieved_docs:
             return ""
         
-        context_parts = ["\n=== RELEVANT KNOWLEDGE BASE ===\n"]
-        
+        parts = [_CONTEXT_HEADER]
         for i, doc in enumerate(retrieved_docs, 1):
-            context_parts.append(
+            parts.append(
                 f"[{i}] {doc['title']} (Category: {doc['category']}, Relevance: {doc['similarity']:.2%})\n"
-                f"{doc['content']}\n"
+                f"{doc['content']}\n\n"
             )
-        
-        context_parts.append("=== END KNOWLEDGE BASE ===\n")
-        return "\n".join(context_parts)
+        parts.append(_CONTEXT_FOOTER)
+        return "".join(parts)
     
     def get_stats(self) -> Dict:
         """Get index statistics"""
@@ -368,11 +678,10 @@ class RAGEngine:
             if not client:
                 return {"error": "Redis not connected"}
             
-            doc_keys = self._get_all_doc_keys(client)
-            
+            # Counted from the cached index, which only rescans after writes
             return {
                 "index_name": self.index_name,
-                "document_count": len(doc_keys),
+                "document_count": len(self._load_index(client)[0]),
                 "vector_dimension": self.vector_dim,
                 "similarity_threshold": self.similarity_threshold,
                 "backend": self.backend or "none"
@@ -388,8 +697,8 @@ class RAGEngine:
             if not client:
                 return False
             
-            doc_key = f"doc:{doc_id}"
-            client.delete(doc_key)
+            client.delete(f"doc:{doc_id}", f"vec:{doc_id}")
+            self._bump_version(client)
             logger.debug(f"Document deleted: {doc_id}")
             return True
         except Exception as e:
@@ -403,14 +712,11 @@ class RAGEngine:
             if not client:
                 return False
             
-            doc_keys = self._get_all_doc_keys(client)
-            for key in doc_keys:
-                try:
-                    client.delete(key)
-                except Exception:
-                    pass
+            cleared = unlink_keys(client, self._get_all_doc_keys(client))
+            unlink_keys(client, self._get_all_doc_keys(client, "vec:*"))
+            self._bump_version(client)
             
-            logger.info(f"Cleared {len(doc_keys)} documents from index")
+            logger.info(f"Cleared {cleared} documents from index")
             return True
         except Exception as e:
             logger.error(f"Error clearing index: {e}")
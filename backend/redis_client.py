@@ -1,17 +1,23 @@
 """
 Redis Configuration and Client
-Handles Redis connection, caching, and vector search
+Handles Redis connection and caching (vector search lives in rag_engine)
 """
+import base64
 import hashlib
 import json
 import logging
 import os
+import time
+from array import array
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 import redis
-from redisvl.index import SearchIndex
-from redisvl.query import VectorQuery
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
@@ -27,12 +33,31 @@ class RedisConfig:
     VECTOR_DIM = 3072 if os.getenv('GEMINI_API_KEY') else 384
     VECTOR_INDEX_NAME = "fintra_knowledge"
     SIMILARITY_THRESHOLD = 0.75
+    # Directory FastEmbed downloads model weights to; point it at a persistent
+    # volume so restarts reuse them (None = FastEmbed's temp-dir default)
+    EMBEDDING_MODEL_CACHE = os.getenv('FASTEMBED_CACHE') or None
+    # ONNX Runtime intra-op threads for local embedding models (default: all cores)
+    EMBEDDING_THREADS = int(os.getenv('EMBEDDING_THREADS', 0)) or os.cpu_count()
+    # Texts per embedding model call when ingesting documents in bulk
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 32))
+    # Optional .npz (mean, components) from RAGEngine.fit_pca reducing embedding dims
+    VECTOR_PCA_PATH = os.getenv('VECTOR_PCA_PATH')
+    # Stored embedding precision: fp32 (JSON list), fp16 or int8 (base64 packed)
+    VECTOR_QUANT = os.getenv('VECTOR_QUANT', 'fp32').lower()
     
     # Cache TTL settings (in seconds)
     CHAT_CACHE_TTL = 3600  # 1 hour
+    EMBEDDING_CACHE_TTL = 86400  # 24 hours
     DATA_CACHE_TTL = 300   # 5 minutes
     SESSION_TTL = 86400    # 24 hours
+    USER_CACHE_TTL = 300   # 5 minutes
     RATE_LIMIT_WINDOW = 60 # 1 minute
+    PING_INTERVAL = 5      # Seconds a successful PING vouches for the connection
+    
+    # Shared connection pool: request threads wait up to POOL_TIMEOUT for a free
+    # connection instead of opening unbounded sockets
+    MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+    POOL_TIMEOUT = 5
 
 class RedisClient:
     """Singleton Redis client wrapper"""
@@ -42,7 +67,7 @@ class RedisClient:
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._client = None
-            cls._instance._vector_index = None
+            cls._instance._last_ping = 0.0
         return cls._instance
     
     def connect(self) -> Any:
@@ -62,9 +87,11 @@ class RedisClient:
                         from upstash_redis import Redis as UpstashRedis
                         logger.info(f"🔒 Using native upstash-redis REST client with REDIS_API_KEY Bearer token at {rest_url}")
                         # The 'token' param exactly translates to: Authorization: Bearer <api_key_bearer>
-                        self._client = UpstashRedis(url=rest_url, token=api_key_bearer)
+                        client = UpstashRedis(url=rest_url, token=api_key_bearer)
                         # Test connection
-                        self._client.ping()
+                        client.ping()
+                        self._client = client
+                        self._last_ping = time.monotonic()
                         logger.info("✅ Redis connection established (REST HTTP)")
                         return self._client
                     except ImportError:
@@ -73,8 +100,10 @@ class RedisClient:
                 # 1. Prefer REDIS_URL if available (It handles username, pass, and rediss:// SSL natively)
                 redis_url = os.getenv('REDIS_URL')
                 
+                # Replies stay bytes: the JSON parser and int() take them directly, so
+                # decoding every reply to str up front is wasted work
                 kwargs = {
-                    'decode_responses': True,
+                    'decode_responses': False,
                     'socket_connect_timeout': 5,
                     'socket_timeout': 5,
                     'health_check_interval': 30,
@@ -86,7 +115,12 @@ class RedisClient:
                     if redis_url.startswith('rediss://'):
                         kwargs['ssl_cert_reqs'] = "none"
                         logger.info("🔒 Using native SSL Rediss URL for connection")
-                    self._client = redis.from_url(redis_url, **kwargs)
+                    pool = redis.BlockingConnectionPool.from_url(
+                        redis_url,
+                        max_connections=RedisConfig.MAX_CONNECTIONS,
+                        timeout=RedisConfig.POOL_TIMEOUT,
+                        **kwargs
+                    )
                 else:    
                     # 2. Fallback to manual pieces
                     is_upstash = "upstash.io" in RedisConfig.HOST
@@ -106,15 +140,24 @@ class RedisClient:
 
                     if use_ssl:
                         connection_params.update({
-                            'ssl': True,
+                            'connection_class': redis.SSLConnection,
                             'ssl_cert_reqs': "none",
                         })
                         logger.info(f"🔒 SSL enabled for Redis at {RedisConfig.HOST}")
 
-                    self._client = redis.Redis(**connection_params)
+                    pool = redis.BlockingConnectionPool(
+                        max_connections=RedisConfig.MAX_CONNECTIONS,
+                        timeout=RedisConfig.POOL_TIMEOUT,
+                        **connection_params
+                    )
+                
+                client = redis.Redis(connection_pool=pool)
                 
-                # Test connection
-                self._client.ping()
+                # Test connection before publishing the client, so has_connection
+                # never reports a connection that is still being attempted
+                client.ping()
+                self._client = client
+                self._last_ping = time.monotonic()
                 logger.info("✅ Redis connection established")
                 
             except Exception as e:
@@ -127,7 +170,12 @@ class RedisClient:
         """Get Redis client, attempt reconnect if needed"""
         try:
             if self._client:
-                self._client.ping()
+                # Cache helpers call this several times per request; only PING once
+                # the last successful check is older than PING_INTERVAL
+                now = time.monotonic()
+                if now - self._last_ping >= RedisConfig.PING_INTERVAL:
+                    self._client.ping()
+                    self._last_ping = now
                 return self._client
         except:
             logger.warning("Redis connection lost, attempting reconnect...")
@@ -138,6 +186,11 @@ class RedisClient:
         except:
             return None
     
+    @property
+    def has_connection(self) -> bool:
+        """Whether a connection was established, without pinging or reconnecting"""
+        return self._client is not None
+    
     def is_connected(self) -> bool:
         """Check if Redis is connected"""
         try:
@@ -149,43 +202,88 @@ class RedisClient:
 # Global Redis client instance
 redis_client = RedisClient()
 
+def scan_keys(client, match: str, count: int = 500) -> List[str]:
+    """Collect keys matching a pattern with incremental SCAN (never the blocking KEYS)"""
+    # Standard redis-py
+    if hasattr(client, 'scan_iter'):
+        return list(client.scan_iter(match=match, count=count))
+    
+    # Upstash REST has no scan_iter; walk the cursor by hand
+    keys = []
+    cursor = 0
+    while True:
+        cursor, batch = client.scan(cursor, match=match, count=count)
+        keys.extend(batch)
+        if int(cursor) == 0:
+            return keys
+
+def unlink_keys(client, keys: List[str], batch_size: int = 500) -> int:
+    """Delete keys in batches with UNLINK, which frees memory off the main Redis thread"""
+    for start in range(0, len(keys), batch_size):
+        client.unlink(*keys[start:start + batch_size])
+    return len(keys)
+
+def dump_json(data: Any) -> str:
+    """
+    Serialize a stored payload as compact JSON (orjson when installed).
+    Returns str, since the Upstash REST client cannot send bytes values.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, separators=(',', ':'))
+
+def load_json(payload) -> Any:
+    """Parse a stored payload from a str or raw bytes reply"""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
 class ChatCache:
     """Chat response caching with Redis"""
     
     @staticmethod
-    def _generate_key(query: str, context: Dict) -> str:
-        """Generate cache key from query and context using SHA-256"""
-        key_data = f"{query}:{json.dumps(context, sort_keys=True)}"
-        return f"chat:cache:{hashlib.sha256(key_data.encode()).hexdigest()[:64]}"
+    def generate_key(query: str, context: Dict) -> str:
+        """
+        Generate cache key from query and context using BLAKE2b.
+        Callers doing a get and then a set should compute it once and pass it as `key`.
+        """
+        if orjson is not None:
+            context_data = orjson.dumps(context, option=orjson.OPT_SORT_KEYS)
+        else:
+            context_data = json.dumps(context, sort_keys=True).encode()
+        digest = hashlib.blake2b(query.encode(), digest_size=32)
+        digest.update(b":")
+        digest.update(context_data)
+        return f"chat:cache:{digest.hexdigest()}"
     
     @staticmethod
-    def get(query: str, context: Dict) -> Optional[str]:
+    def get(query: str, context: Dict, key: str = None) -> Optional[str]:
         """Get cached chat response"""
         try:
             client = redis_client.get_client()
             if not client:
                 return None
             
-            key = ChatCache._generate_key(query, context)
+            key = key or ChatCache.generate_key(query, context)
             cached = client.get(key)
             
             if cached:
                 logger.debug(f"Chat cache hit: {key}")
-                return json.loads(cached)['response']
+                return load_json(cached)['response']
             return None
         except Exception as e:
             logger.error(f"Chat cache get error: {e}")
             return None
     
     @staticmethod
-    def set(query: str, context: Dict, response: str, ttl: int = None):
+    def set(query: str, context: Dict, response: str, ttl: int = None, key: str = None):
         """Cache chat response"""
         try:
             client = redis_client.get_client()
             if not client:
                 return
             
-            key = ChatCache._generate_key(query, context)
+            key = key or ChatCache.generate_key(query, context)
             ttl = ttl or RedisConfig.CHAT_CACHE_TTL
             
             data = {
@@ -195,7 +293,7 @@ class ChatCache:
                 'cached_at': datetime.now().isoformat()
             }
             
-            client.set(key, json.dumps(data), ex=ttl)
+            client.set(key, dump_json(data), ex=ttl)
             logger.debug(f"Chat response cached: {key}")
         except Exception as e:
             logger.error(f"Chat cache set error: {e}")
@@ -208,16 +306,82 @@ class ChatCache:
             if not client:
                 return
             
-            keys = client.keys(pattern)
-            if keys:
-                client.delete(*keys)
-                logger.info(f"Invalidated {len(keys)} chat cache entries")
+            deleted = unlink_keys(client, scan_keys(client, pattern))
+            if deleted:
+                logger.info(f"Invalidated {deleted} chat cache entries")
         except Exception as e:
             logger.error(f"Chat cache invalidation error: {e}")
 
+class EmbeddingCache:
+    """Query embedding caching with Redis, so repeated queries skip the model"""
+    
+    @staticmethod
+    def _generate_key(text: str, namespace: str) -> str:
+        """Generate cache key from the embedding namespace (model) and text using SHA-256"""
+        return f"emb:{namespace}:{hashlib.sha256(text.encode()).hexdigest()[:32]}"
+    
+    @staticmethod
+    def get(text: str, namespace: str) -> Optional[List[float]]:
+        """Get cached embedding"""
+        try:
+            client = redis_client.get_client()
+            if not client:
+                return None
+            
+            cached = client.get(EmbeddingCache._generate_key(text, namespace))
+            if not cached:
+                return None
+            vector = array('f')
+            vector.frombytes(base64.b64decode(cached))
+            return vector.tolist()
+        except Exception as e:
+            logger.error(f"Embedding cache get error: {e}")
+            return None
+    
+    @staticmethod
+    def set(text: str, namespace: str, embedding: List[float], ttl: int = None):
+        """Cache embedding as base64 packed float32, so it round-trips through the str-only Upstash REST client"""
+        try:
+            client = redis_client.get_client()
+            if not client:
+                return
+            
+            key = EmbeddingCache._generate_key(text, namespace)
+            packed = base64.b64encode(array('f', embedding).tobytes()).decode('ascii')
+            client.set(key, packed, ex=ttl or RedisConfig.EMBEDDING_CACHE_TTL)
+        except Exception as e:
+            logger.error(f"Embedding cache set error: {e}")
+
+# Increment a window counter and start its expiry on the first hit, atomically
+_RATE_LIMIT_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
 class RateLimiter:
     """Rate limiting for API endpoints"""
     
+    _script = None
+    _script_client = None
+    
+    @classmethod
+    def _increment(cls, client, key: str, window: int) -> int:
+        """Count a request in one round trip: a cached Lua script, or INCR on REST clients"""
+        if hasattr(client, 'register_script'):
+            if cls._script_client is not client:
+                cls._script = client.register_script(_RATE_LIMIT_SCRIPT)
+                cls._script_client = client
+            return int(cls._script(keys=[key], args=[window]))
+        
+        # Upstash REST: INCR is still atomic, EXPIRE follows only on a new window
+        count = int(client.incr(key))
+        if count == 1:
+            client.expire(key, window)
+        return count
+    
     @staticmethod
     def is_allowed(user_id: str, endpoint: str, max_requests: int = 30) -> bool:
         """
@@ -231,23 +395,11 @@ class RateLimiter:
                 return True
             
             key = f"rate_limit:{user_id}:{endpoint}"
-            window = RedisConfig.RATE_LIMIT_WINDOW
-            
-            # Get current count
-            current = client.get(key)
-            
-            if current is None:
-                # First request in window
-                client.set(key, 1, ex=window)
-                return True
+            count = RateLimiter._increment(client, key, RedisConfig.RATE_LIMIT_WINDOW)
             
-            current_count = int(current)
-            if current_count >= max_requests:
+            if count > max_requests:
                 logger.warning(f"Rate limit exceeded: {user_id} - {endpoint}")
                 return False
-            
-            # Increment counter
-            client.incr(key)
             return True
             
         except Exception as e:
@@ -287,7 +439,7 @@ class SessionManager:
             key = f"session:{session_id}"
             ttl = ttl or RedisConfig.SESSION_TTL
             
-            client.set(key, json.dumps(data), ex=ttl)
+            client.set(key, dump_json(data), ex=ttl)
             logger.debug(f"Session stored: {session_id}")
         except Exception as e:
             logger.error(f"Session store error: {e}")
@@ -306,7 +458,7 @@ class SessionManager:
             if data:
                 # Refresh TTL on access
                 client.expire(key, RedisConfig.SESSION_TTL)
-                return json.loads(data)
+                return load_json(data)
             return None
         except Exception as e:
             logger.error(f"Session get error: {e}")
@@ -326,6 +478,36 @@ class SessionManager:
         except Exception as e:
             logger.error(f"Session delete error: {e}")
 
+class UserCache:
+    """User profile caching, so polled endpoints like /auth/status skip the database"""
+    
+    @staticmethod
+    def get(user_id: str) -> Optional[Dict]:
+        """Get a cached profile (user_id, email, name, picture)"""
+        try:
+            client = redis_client.get_client()
+            if not client:
+                return None
+            
+            data = client.get(f"user:{user_id}")
+            return load_json(data) if data else None
+        except Exception as e:
+            logger.error(f"User cache get error: {e}")
+            return None
+    
+    @staticmethod
+    def set(user_id: str, profile: Dict, ttl: int = None):
+        """Cache a user profile"""
+        try:
+            client = redis_client.get_client()
+            if not client:
+                return
+            
+            ttl = ttl or RedisConfig.USER_CACHE_TTL
+            client.set(f"user:{user_id}", dump_json(profile), ex=ttl)
+        except Exception as e:
+            logger.error(f"User cache set error: {e}")
+
 class DataCache:
     """General data caching"""
     
@@ -338,7 +520,7 @@ class DataCache:
                 return None
             
             data = client.get(f"data:{key}")
-            return json.loads(data) if data else None
+            return load_json(data) if data else None
         except Exception as e:
             logger.error(f"Data cache get error: {e}")
             return None
@@ -352,7 +534,7 @@ class DataCache:
                 return
             
             ttl = ttl or RedisConfig.DATA_CACHE_TTL
-            client.set(f"data:{key}", json.dumps(data), ex=ttl)
+            client.set(f"data:{key}", dump_json(data), ex=ttl)
         except Exception as e:
             logger.error(f"Data cache set error: {e}")
     
@@ -3,24 +3,33 @@ Routes Module
 Defines all Flask routes and API endpoints.
 """
 
+import base64
+import io
 import logging
 import os
 import os
 import re
 import secrets
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from urllib.parse import urlencode
 
 import jwt
 import pandas as pd
 import requests
-from flask import Blueprint, jsonify, make_response, redirect, request, session
+from flask import Blueprint, Response, jsonify, make_response, redirect, request, session
+from sqlalchemy.dialects import postgresql, sqlite
 
 # Google Auth imports for secure ID token verification
-from google.auth.transport import requests as google_requests
 from google.oauth2 import id_token as google_id_token
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from backend.analysis import (
     call_groq_api,
     clean_df,
@@ -33,9 +42,12 @@ from backend.analysis import (
     get_ai_position_summary,
     latest_symbol_data,
     screen_prompt_safety,
+    select_records,
 )
 from backend.auth import (
     generate_jwt_token,
+    google_auth_request,
+    http_session,
     require_auth,
     set_token_cookies,
     verify_jwt_token,
@@ -48,6 +60,7 @@ from backend.backtesting import (
     check_data_availability,
     fetch_from_yfinance,
     get_current_price,
+    get_data_lag_date,
     get_stock_data_with_fallback,
     load_stock_data,
 )
@@ -87,11 +100,14 @@ from backend.validation import (
 
 # Redis and RAG imports with explicit feature flags
 try:
+    from redis.exceptions import ResponseError as RedisResponseError
+
     from backend.rag_engine import init_rag, rag_engine
     from backend.redis_client import (
         ChatCache,
         DataCache,
         RateLimiter,
+        UserCache,
         init_redis,
         redis_client,
     )
@@ -179,6 +195,19 @@ class OAuthStateManager:
             logger.error(f"Failed to store OAuth state: {e}")
         return False
 
+    @staticmethod
+    def _consume(client, key: str):
+        """Read and delete a key atomically in one round trip, so a state is used once"""
+        try:
+            return client.getdel(key)
+        except RedisResponseError:
+            # Redis < 6.2 has no GETDEL; a MULTI/EXEC pipeline is the next best thing
+            pipe = client.pipeline()
+            pipe.get(key)
+            pipe.delete(key)
+            value, _ = pipe.execute()
+            return value
+
     @staticmethod
     def validate_and_clear_state(state: str) -> bool:
         """Validate state token and clear it from Redis.
@@ -193,10 +222,8 @@ class OAuthStateManager:
                     "Redis client unavailable during state validation – allowing OAuth to proceed"
                 )
                 return True
-            key = f"oauth:state:{state}"
-            value = client.get(key)
+            value = OAuthStateManager._consume(client, f"oauth:state:{state}")
             if value:
-                client.delete(key)
                 logger.debug(f"OAuth state validated and cleared: {state[:16]}...")
                 return True
             else:
@@ -240,7 +267,73 @@ def get_user_from_token():
     return user_id, db_user
 
 
+def _user_profile(db_user) -> dict:
+    """The profile fields /auth/status reports, in the form UserCache stores"""
+    return {
+        "user_id": db_user.google_user_id,
+        "email": db_user.email,
+        "name": db_user.name,
+        "picture": db_user.picture,
+    }
+
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert_user(user_id: str, email: str, name: str, picture: str) -> dict:
+    """
+    Create or update a user from their Google profile and commit.
+    Uses a single INSERT ... ON CONFLICT statement where the database supports it.
+    """
+    profile = {"user_id": user_id, "email": email, "name": name, "picture": picture}
+    insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(User).values(google_user_id=user_id, email=email, name=name, picture=picture)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[User.google_user_id],
+            set_={"email": stmt.excluded.email, "name": stmt.excluded.name, "picture": stmt.excluded.picture},
+        ))
+    else:
+        db_user = User.query.filter_by(google_user_id=user_id).first()
+        if not db_user:
+            db_user = User(google_user_id=user_id)
+            db.session.add(db_user)
+        db_user.email, db_user.name, db_user.picture = email, name, picture
+    db.session.commit()
+    return profile
+
+
+def get_user_profile(user_id: str):
+    """Look up a user's profile, from UserCache when possible, else the database."""
+    if REDIS_AVAILABLE:
+        profile = UserCache.get(user_id)
+        if profile:
+            return profile
+
+    db_user = User.query.filter_by(google_user_id=user_id).first()
+    if not db_user:
+        return None
+    profile = _user_profile(db_user)
+    if REDIS_AVAILABLE:
+        UserCache.set(user_id, profile)
+    return profile
+
+
 # ==================== AUTHENTICATION ROUTES ====================
+@lru_cache(maxsize=1)
+def _google_auth_url_prefix() -> str:
+    """Google consent URL with every parameter except the per-login state, encoded once"""
+    auth_params = {
+        "client_id": Config.GOOGLE_CLIENT_ID,
+        "redirect_uri": Config.REDIRECT_URI,
+        "response_type": "code",
+        "scope": " ".join(Config.SCOPES),
+        "access_type": "offline",
+        "prompt": "select_account",
+    }
+    return f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(auth_params)}"
+
+
 @api.route("/auth/login", methods=["GET", "OPTIONS"])
 def auth_login():
     """Initiate Google OAuth flow."""
@@ -259,18 +352,8 @@ def auth_login():
 
         logger.info(f"Generating auth URL with redirect_uri: {Config.REDIRECT_URI}")
 
-        auth_params = {
-            "client_id": Config.GOOGLE_CLIENT_ID,
-            "redirect_uri": Config.REDIRECT_URI,
-            "response_type": "code",
-            "scope": " ".join(Config.SCOPES),
-            "access_type": "offline",
-            "prompt": "select_account",
-            "state": state,
-        }
-        auth_url = (
-            f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(auth_params)}"
-        )
+        # token_urlsafe output needs no URL quoting
+        auth_url = f"{_google_auth_url_prefix()}&state={state}"
 
         resp = jsonify(success=True, auth_url=auth_url, state_token=state)
         resp.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
@@ -327,7 +410,7 @@ def oauth_callback():
         }
 
         try:
-            token_response = requests.post(
+            token_response = http_session.post(
                 "https://oauth2.googleapis.com/token", data=token_data, timeout=10
             )
             token_response.raise_for_status()
@@ -350,9 +433,10 @@ def oauth_callback():
         try:
             # Verify ID token signature using Google's public keys
             # This ensures the token was actually issued by Google and hasn't been tampered with
+            # (the shared transport caches the certificates for their max-age)
             user_info = google_id_token.verify_oauth2_token(
                 id_token,
-                google_requests.Request(),
+                google_auth_request,
                 Config.GOOGLE_CLIENT_ID,
                 clock_skew_in_seconds=10,
             )
@@ -371,21 +455,16 @@ def oauth_callback():
         logger.info(f"OAuth callback processing for Google User ID: {user_id}")
 
         # --- NEW: Sync with database ---
-        # Find user in our DB or create them if they are new.
-        db_user = User.query.filter_by(google_user_id=user_id).first()
-        if not db_user:
-            db_user = User(
-                google_user_id=user_id,
-                email=user_info.get("email"),
-                name=user_info.get("name"),
-                picture=user_info.get("picture"),
-            )
-            db.session.add(db_user)
-        else:  # Update user info if it has changed
-            db_user.email = user_info.get("email")
-            db_user.name = user_info.get("name")
-            db_user.picture = user_info.get("picture")
-        db.session.commit()
+        # Create the user if they are new, otherwise update their info
+        profile = upsert_user(
+            user_id,
+            user_info.get("email"),
+            user_info.get("name"),
+            user_info.get("picture"),
+        )
+        if REDIS_AVAILABLE:
+            # Refresh the cached profile /auth/status reads
+            UserCache.set(user_id, profile)
 
         logger.info(f"User '{user_info.get('email')}' authenticated. Storing session.")
         # This user_data is only for JWT generation, not for in-memory session state.
@@ -504,17 +583,17 @@ def auth_status():
             if payload:
                 user_id = payload.get("user_id")
                 if user_id:
-                    db_user = User.query.filter_by(google_user_id=user_id).first()
-                    if db_user:
+                    profile = get_user_profile(user_id)
+                    if profile:
                         expires_at = datetime.fromtimestamp(
                             payload["exp"], tz=timezone.utc
                         )
                         response = jsonify(
                             authenticated=True,
                             user={
-                                "email": db_user.email,
-                                "name": db_user.name,
-                                "picture": db_user.picture,
+                                "email": profile["email"],
+                                "name": profile["name"],
+                                "picture": profile["picture"],
                                 "expires_in": int(
                                     (
                                         expires_at - datetime.now(timezone.utc)
@@ -540,13 +619,13 @@ def auth_status():
             if payload:
                 user_id = payload.get("user_id")
                 if user_id:
-                    db_user = User.query.filter_by(google_user_id=user_id).first()
-                    if db_user:
+                    profile = get_user_profile(user_id)
+                    if profile:
                         # Generate new access token
                         user_data = {
-                            "user_id": db_user.google_user_id,
-                            "email": db_user.email,
-                            "name": db_user.name,
+                            "user_id": profile["user_id"],
+                            "email": profile["email"],
+                            "name": profile["name"],
                         }
                         new_access_token = generate_jwt_token(
                             user_data,
@@ -558,9 +637,9 @@ def auth_status():
                         response = jsonify(
                             authenticated=True,
                             user={
-                                "email": db_user.email,
-                                "name": db_user.name,
-                                "picture": db_user.picture,
+                                "email": profile["email"],
+                                "name": profile["name"],
+                                "picture": profile["picture"],
                                 "expires_in": Config.parse_time_to_seconds(
                                     Config.ACCESS_TOKEN_EXPIRETIME
                                 ),
@@ -568,7 +647,7 @@ def auth_status():
                         )
                         set_token_cookies(response, new_access_token, refresh_token)
                         logger.info(
-                            f"🔄 Auth status recovered session via refresh token for {db_user.email}"
+                            f"🔄 Auth status recovered session via refresh token for {profile['email']}"
                         )
                         # Prevent caching
                         response.headers["Cache-Control"] = (
@@ -681,6 +760,75 @@ def get_stock_date_range(symbol):
 
 
 # ==================== DATA & ANALYSIS ROUTES ====================
+_INDICATOR_COLUMNS = ["MA5", "MA10", "RSI", "MACD", "Signal", "Histogram"]
+
+
+def json_response(payload, status: int = 200):
+    """JSON response encoded with orjson when installed (jsonify otherwise)"""
+    if orjson is None:
+        return jsonify(payload), status
+    return Response(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+# Worker threads for AI analysis calls that overlap with a request's own work
+_ai_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ai-analysis")
+
+
+# Rows of daily history /get_data analyses, and how far (in days) local parquet
+# may trail the SEBI lag date before yfinance is preferred over it
+GET_DATA_ROWS = 90
+LOCAL_MAX_STALENESS_DAYS = 7
+
+
+def _local_history_is_current(df) -> bool:
+    """Whether lagged local data reaches (nearly) the lag date and covers GET_DATA_ROWS rows"""
+    cutoff = pd.Timestamp(get_data_lag_date() - timedelta(days=LOCAL_MAX_STALENESS_DAYS))
+    last = df.index[-1]
+    if last.tzinfo is not None:
+        cutoff = cutoff.tz_localize(last.tzinfo)
+    return len(df) >= GET_DATA_ROWS and last >= cutoff
+
+
+def get_history_cached(symbol: str, period: str = "90d"):
+    """
+    Fetch daily history via fetch_from_yfinance, sharing it across workers in Redis.
+
+    Daily bars only change once per day, so entries are keyed by the SEBI lag
+    date and expire at the next UTC midnight. Frames are stored as base64
+    parquet (the Upstash REST client only carries str values).
+    """
+    if not REDIS_AVAILABLE:
+        return fetch_from_yfinance(symbol, period=period, interval="1d")
+
+    cache_key = f"yf:{symbol}:{period}:{get_data_lag_date():%Y-%m-%d}"
+    cached = DataCache.get(cache_key)
+    if cached:
+        try:
+            return pd.read_parquet(io.BytesIO(base64.b64decode(cached)))
+        except Exception as e:
+            logger.warning(f"Discarding unreadable history cache entry {cache_key}: {e}")
+
+    hist = fetch_from_yfinance(symbol, period=period, interval="1d")
+    if hist is not None and not hist.empty:
+        try:
+            buf = io.BytesIO()
+            hist.to_parquet(buf)
+            now = datetime.now(timezone.utc)
+            midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            DataCache.set(
+                cache_key,
+                base64.b64encode(buf.getvalue()).decode("ascii"),
+                ttl=max(60, int((midnight - now).total_seconds())),
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache history for {symbol}: {e}")
+    return hist
+
+
 @api.route("/get_data", methods=["POST"])
 def get_data():
     """Fetch and analyze stock data"""
@@ -703,7 +851,8 @@ def get_data():
     symbol = symbol.upper()
 
     try:
-        # Use yfinance as primary source, local parquet files as fallback
+        # Local parquet is the primary source when it is current; yfinance fills in
+        # for symbols missing from the store or whose files have fallen behind
         metadata = {
             "symbol": symbol,
             "source": None,
@@ -714,47 +863,49 @@ def get_data():
             "lag_applied": True,
         }
 
-        # Step 1: Try yfinance first (primary source)
-        hist = fetch_from_yfinance(symbol, period="90d", interval="1d")
-        if hist is not None and not hist.empty:
-            metadata["yfinance_available"] = True
-            hist = apply_sebi_lag(hist)
-            metadata["data_completeness"]["yfinance_rows"] = len(hist)
-            if len(hist) >= 30:
-                logger.info(f"Using yfinance data for {symbol}: {len(hist)} rows")
-                metadata["source"] = "yfinance"
-            else:
-                logger.warning(
-                    f"yfinance data insufficient for {symbol} after lag ({len(hist)} rows), trying local"
-                )
-                metadata["data_completeness"]["yfinance_insufficient"] = True
-                hist = None
-        else:
-            logger.warning(
-                f"yfinance returned no data for {symbol}, falling back to local"
+        # Step 1: Try local parquet data first (no network round trip)
+        hist = None
+        local_df, local_info = load_stock_data(symbol, apply_lag=True)
+        if local_df is not None and not local_df.empty:
+            metadata["local_available"] = True
+            metadata["data_completeness"]["local_rows"] = len(local_df)
+            metadata["data_completeness"]["local_date_range"] = local_info.get(
+                "date_range", {}
             )
-            metadata["data_completeness"]["yfinance_missing"] = True
-            hist = None
-
-        # Step 2: Fall back to local parquet data if yfinance failed/insufficient
-        if hist is None or hist.empty:
-            logger.info(f"Loading {symbol} from local parquet data (fallback)")
-            local_df, local_info = load_stock_data(symbol, apply_lag=True)
-            if local_df is not None and not local_df.empty:
-                metadata["local_available"] = True
-                metadata["data_completeness"]["local_rows"] = len(local_df)
-                metadata["data_completeness"]["local_date_range"] = local_info.get(
-                    "date_range", {}
-                )
-                metadata["data_completeness"]["cached"] = local_info.get(
-                    "cached", False
-                )
+            metadata["data_completeness"]["cached"] = local_info.get("cached", False)
+            if _local_history_is_current(local_df):
+                logger.info(f"Using local parquet data for {symbol}")
                 metadata["source"] = "local"
-                metadata["yfinance_fallback"] = True
-                hist = local_df
+                hist = local_df.tail(GET_DATA_ROWS)
+        else:
+            metadata["data_completeness"]["local_missing"] = True
+
+        # Step 2: Fall back to yfinance if local data is missing or stale
+        if hist is None:
+            yf_hist = get_history_cached(symbol, period="90d")
+            if yf_hist is not None and not yf_hist.empty:
+                metadata["yfinance_available"] = True
+                yf_hist = apply_sebi_lag(yf_hist)
+                metadata["data_completeness"]["yfinance_rows"] = len(yf_hist)
+                if len(yf_hist) >= 30:
+                    logger.info(f"Using yfinance data for {symbol}: {len(yf_hist)} rows")
+                    metadata["source"] = "yfinance"
+                    metadata["yfinance_fallback"] = True
+                    hist = yf_hist
+                else:
+                    logger.warning(
+                        f"yfinance data insufficient for {symbol} after lag ({len(yf_hist)} rows)"
+                    )
+                    metadata["data_completeness"]["yfinance_insufficient"] = True
             else:
-                metadata["data_completeness"]["local_missing"] = True
-                hist = None
+                logger.warning(f"yfinance returned no data for {symbol}")
+                metadata["data_completeness"]["yfinance_missing"] = True
+
+        # Step 3: Stale local data still beats no data
+        if hist is None and metadata["local_available"]:
+            logger.info(f"Using stale local parquet data for {symbol} (last resort)")
+            metadata["source"] = "local"
+            hist = local_df.tail(GET_DATA_ROWS)
 
         if hist is None or hist.empty:
             # Provide detailed error message about fallback attempts
@@ -801,19 +952,25 @@ def get_data():
                 f"Please try again later or contact support if the issue persists."
             ), 422
 
+        # hist is a slice of the loaded frame (tail / apply_sebi_lag); copy the
+        # ~90 rows so adding columns never writes through under pandas 2
+        hist = hist.copy()
         hist["MA5"] = hist["Close"].rolling(window=5).mean()
         hist["MA10"] = hist["Close"].rolling(window=10).mean()
         hist["RSI"] = compute_rsi(hist["Close"])
         hist["MACD"], hist["Signal"], hist["Histogram"] = compute_macd(hist["Close"])
 
+        # Serialize every row once; the AI input and each display table select from it
+        records = clean_df(hist, ["Open", "High", "Low", "Close", "Volume", *_INDICATOR_COLUMNS])
+
         # For AI analysis, use last 30 days of data that has all indicators calculated
         # (RSI needs 14 days, so we need at least 14 days of history)
-        hist_with_indicators = hist.dropna(
-            subset=["MA5", "MA10", "RSI", "MACD", "Signal", "Histogram"]
+        rows_with_indicators = select_records(
+            records, ["Open", "High", "Low", "Close", "Volume", *_INDICATOR_COLUMNS]
         )
 
         # Check if we have any data with indicators after dropping NaN
-        if hist_with_indicators.empty:
+        if not rows_with_indicators:
             logger.warning(
                 f"No valid indicator data for {symbol} after calculating. Data has {len(hist)} rows but indicators are all NaN."
             )
@@ -823,27 +980,14 @@ def get_data():
                 f"Please try a different symbol or contact support."
             ), 422
 
-        latest_data_list = clean_df(
-            hist_with_indicators.tail(30),
-            [
-                "Open",
-                "High",
-                "Low",
-                "Close",
-                "Volume",
-                "MA5",
-                "MA10",
-                "RSI",
-                "MACD",
-                "Signal",
-                "Histogram",
-            ],
-        )
+        latest_data_list = rows_with_indicators[-30:]
 
         latest_symbol_data[symbol] = latest_data_list
 
+        # The AI review is a network call independent of everything below, so it
+        # runs on a worker thread while this one builds the rule-based text and tables
+        ai_future = _ai_executor.submit(get_ai_analysis, symbol, latest_data_list)
         rule_based_text = generate_rule_based_analysis(symbol, latest_data_list)
-        gemini_analysis = get_ai_analysis(symbol, latest_data_list)
 
         if user_id not in conversation_context:
             conversation_context[user_id] = {
@@ -866,32 +1010,36 @@ def get_data():
 
         # For display tables, use data that has the specific indicators available
         # Don't require ALL indicators to be present - just the ones needed for each table
-        hist_ohlcv = hist.dropna(subset=["Open", "High", "Low", "Close", "Volume"])
-        hist_ma = hist.dropna(subset=["MA5", "MA10"])
-        hist_rsi = hist.dropna(subset=["RSI"])
-        hist_macd = hist.dropna(subset=["MACD", "Signal", "Histogram"])
+        ohlcv_rows = select_records(records, ["Open", "High", "Low", "Close", "Volume"])
+        ma_rows = select_records(records, ["MA5", "MA10"])
+        rsi_rows = select_records(records, ["RSI"])
+        macd_rows = select_records(records, ["MACD", "Signal", "Histogram"])
 
-        return jsonify(
-            ticker=symbol,
-            OHLCV=clean_df(hist_ohlcv, ["Open", "High", "Low", "Close", "Volume"]),
-            MA=clean_df(hist_ma, ["MA5", "MA10"]),
-            RSI=clean_df(hist_rsi, ["RSI"]),
-            MACD=clean_df(hist_macd, ["MACD", "Signal", "Histogram"]),
-            AI_Review=gemini_analysis,
-            Rule_Based_Analysis=rule_based_text,
-            data_source={
-                "primary": metadata.get("source", "unknown"),
-                "yfinance_fallback": metadata.get("yfinance_fallback", False),
-                "local_available": metadata.get("local_available", False),
-                "yfinance_available": metadata.get("yfinance_available", False),
-            },
-            sebi_compliance={
-                "data_lag_days": DATA_LAG_DAYS,
-                "effective_last_date": effective_date,
-                "lag_date": lag_date.strftime("%Y-%m-%d"),
-                "compliance_notice": f"This analysis uses historical data with a mandatory {DATA_LAG_DAYS}-day lag in accordance with SEBI regulations. No current market data is included.",
-            },
-        ), 200
+        gemini_analysis = ai_future.result()
+
+        return json_response(
+            {
+                "ticker": symbol,
+                "OHLCV": ohlcv_rows,
+                "MA": ma_rows,
+                "RSI": rsi_rows,
+                "MACD": macd_rows,
+                "AI_Review": gemini_analysis,
+                "Rule_Based_Analysis": rule_based_text,
+                "data_source": {
+                    "primary": metadata.get("source", "unknown"),
+                    "yfinance_fallback": metadata.get("yfinance_fallback", False),
+                    "local_available": metadata.get("local_available", False),
+                    "yfinance_available": metadata.get("yfinance_available", False),
+                },
+                "sebi_compliance": {
+                    "data_lag_days": DATA_LAG_DAYS,
+                    "effective_last_date": effective_date,
+                    "lag_date": lag_date.strftime("%Y-%m-%d"),
+                    "compliance_notice": f"This analysis uses historical data with a mandatory {DATA_LAG_DAYS}-day lag in accordance with SEBI regulations. No current market data is included.",
+                },
+            }
+        )
     except Exception as e:
         logger.error(f"❌ Error in /api/get_data: {e}")
         return jsonify(error=f"Server error: {str(e)}"), 500
@@ -951,6 +1099,7 @@ def chat():
         "symbol": symbol,
         "position_id": selected_position_id,
     }
+    chat_cache_key = None
 
     try:
         # ============================================
@@ -994,7 +1143,9 @@ def chat():
         # ============================================
 
         if REDIS_AVAILABLE:
-            cached_response = ChatCache.get(query, cache_context)
+            # Hashed once here and reused by ChatCache.set below
+            chat_cache_key = ChatCache.generate_key(query, cache_context)
+            cached_response = ChatCache.get(query, cache_context, key=chat_cache_key)
             if cached_response:
                 logger.debug("Chat cache hit - returning cached response")
                 return jsonify(
@@ -1140,7 +1291,7 @@ def chat():
 
         # Only cache if no personal/sensitive data
         if REDIS_AVAILABLE and not validation_metadata.get("correction_needed"):
-            ChatCache.set(query, cache_context, assistant_response)
+            ChatCache.set(query, cache_context, assistant_response, key=chat_cache_key)
 
         # Build validation info for response
         validation_info = {
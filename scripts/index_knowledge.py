@@ -76,34 +76,20 @@ def index_documents():
     
     # Index documents
     logger.info("\n5. Indexing documents...")
-    success_count = 0
-    failed_count = 0
-    
-    for i, doc in enumerate(documents, 1):
-        try:
-            doc_id = doc.get('id', f"doc_{i}")
-            title = doc.get('title', 'Untitled')
-            content = doc.get('content', '')
-            category = doc.get('category', 'general')
-            tags = doc.get('tags', [])
-            
-            logger.info(f"  [{i}/{len(documents)}] Indexing: {title}")
-            
-            if rag_engine.add_document(
-                doc_id=doc_id,
-                content=content,
-                title=title,
-                category=category,
-                tags=tags
-            ):
-                success_count += 1
-            else:
-                failed_count += 1
-                logger.warning(f"  ⚠️ Failed to index: {title}")
-                
-        except Exception as e:
-            failed_count += 1
-            logger.error(f"  ❌ Error indexing document {i}: {e}")
+    batch = [
+        {
+            'id': doc.get('id', f"doc_{i}"),
+            'title': doc.get('title', 'Untitled'),
+            'content': doc.get('content', ''),
+            'category': doc.get('category', 'general'),
+            'tags': doc.get('tags', [])
+        }
+        for i, doc in enumerate(documents, 1)
+    ]
+    success_count = rag_engine.add_documents(batch)
+    failed_count = len(batch) - success_count
+    if failed_count:
+        logger.warning(f"  ⚠️ {failed_count} documents could not be embedded")
     
     # Show stats
     logger.info("\n" + "=" * 60)
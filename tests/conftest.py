@@ -1,6 +1,7 @@
 """
 Pytest configuration and fixtures for Fintra application tests
 """
+import fnmatch
 import os
 import sys
 from datetime import datetime, timedelta, timezone
@@ -11,6 +12,7 @@ import pytest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from backend.app import create_app
+from backend.config import Config
 from backend.database import db
 from backend.models import Position, User
 
@@ -26,6 +28,10 @@ def app():
     os.environ['GOOGLE_CLIENT_ID'] = 'test-google-client-id'
     os.environ['GOOGLE_CLIENT_SECRET'] = 'test-google-client-secret'
     os.environ['CLIENT_ORIGIN'] = 'http://localhost:3000'
+    # Config is built at import, before the environment above is set, so the
+    # database URI is overridden directly before the engine is created
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
     
     app = create_app()
     app.config.update({
@@ -41,6 +47,7 @@ def app():
         yield app
         db.session.remove()
         db.drop_all()
+    monkeypatch.undo()
 
 
 @pytest.fixture(scope='function')
@@ -162,3 +169,95 @@ def mock_backtest_data():
         'atr_multiplier': 3.0,
         'risk_per_trade': 0.02
     }
+
+
+class FakeRedis:
+    """Dict-backed subset of the Redis client API used by the cache helpers and RAG engine."""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+        self.calls = []
+        # False mimics redis-py without decode_responses: replies come back as bytes
+        self.decode_responses = True
+
+    def _record(self, name):
+        self.calls.append(name)
+
+    def _reply(self, value):
+        if value is None or self.decode_responses or isinstance(value, bytes):
+            return value
+        return value.encode()
+
+    @staticmethod
+    def _key(key):
+        return key.decode() if isinstance(key, bytes) else key
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        self._record('get')
+        return self._reply(self.store.get(self._key(key)))
+
+    def mget(self, *keys):
+        self._record('mget')
+        return [self._reply(self.store.get(self._key(k))) for k in keys]
+
+    def set(self, key, value, ex=None):
+        self._record('set')
+        self.store[self._key(key)] = value if isinstance(value, (str, bytes)) else str(value)
+        if ex is not None:
+            self.ttls[self._key(key)] = ex
+        return True
+
+    def incr(self, key):
+        self._record('incr')
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+    def expire(self, key, seconds):
+        self._record('expire')
+        self.ttls[self._key(key)] = seconds
+        return True
+
+    def delete(self, *keys):
+        self._record('delete')
+        return sum(self.store.pop(self._key(k), None) is not None for k in keys)
+
+    def unlink(self, *keys):
+        self._record('unlink')
+        return sum(self.store.pop(self._key(k), None) is not None for k in keys)
+
+    def pipeline(self, transaction=True):
+        self._record('pipeline')
+        return FakePipeline(self)
+
+    def scan_iter(self, match='*', count=None):
+        self._record('scan')
+        return iter([self._reply(k) for k in list(self.store) if fnmatch.fnmatch(k, match)])
+
+
+class FakePipeline:
+    """Queues FakeRedis commands until execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        self.redis._record('execute')
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Route the shared Redis client to an in-memory FakeRedis"""
+    from backend.redis_client import redis_client
+
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_client, 'get_client', lambda: fake)
+    return fake
@@ -0,0 +1,50 @@
+"""
+Unit tests for the analysis helpers.
+
+Tests the record serialization used by /get_data.
+"""
+import numpy as np
+import pandas as pd
+
+from backend.analysis import clean_df, select_records
+
+
+class TestCleanDf:
+    """Tests for DataFrame serialization."""
+
+    def test_matches_per_cell_conversion(self):
+        """Test records carry formatted dates, native numbers and None for NaN or inf."""
+        df = pd.DataFrame({
+            'Close': [1.5, np.nan, np.inf],
+            'Volume': np.array([10, 20, 30], dtype=np.int64),
+            'RSI': [np.nan, 55.0, 60.0],
+        }, index=pd.DatetimeIndex(['2024-01-01', '2024-01-02', '2024-01-03'], name='Date'))
+
+        records = clean_df(df, ['Close', 'Volume', 'RSI', 'Missing'])
+
+        assert records == [
+            {'Date': '2024-01-01', 'Close': 1.5, 'Volume': 10, 'RSI': None},
+            {'Date': '2024-01-02', 'Close': None, 'Volume': 20, 'RSI': 55.0},
+            {'Date': '2024-01-03', 'Close': None, 'Volume': 30, 'RSI': 60.0},
+        ]
+        assert type(records[0]['Volume']) is int and type(records[0]['Close']) is float
+
+    def test_index_not_named_date_is_left_out(self):
+        """Test frames indexed by another name (e.g. intraday Datetime) serialize without a Date key."""
+        df = pd.DataFrame({'Close': [1.0, 2.0]},
+                          index=pd.DatetimeIndex(['2024-01-01 09:15', '2024-01-01 09:20'], name='Datetime'))
+
+        records = clean_df(df, ['Close'])
+
+        assert records == [{'Close': 1.0}, {'Close': 2.0}]
+        assert select_records(records, ['Close']) == records
+
+    def test_select_records_keeps_complete_rows(self):
+        """Test selecting columns drops rows missing any of them, like dropna on that subset."""
+        records = [
+            {'Date': 'd1', 'Close': 1.0, 'RSI': None},
+            {'Date': 'd2', 'Close': 2.0, 'RSI': 50.0},
+        ]
+
+        assert select_records(records, ['RSI']) == [{'Date': 'd2', 'RSI': 50.0}]
+        assert select_records(records, ['Close']) == [{'Date': 'd1', 'Close': 1.0}, {'Date': 'd2', 'Close': 2.0}]
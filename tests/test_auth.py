@@ -11,6 +11,7 @@ import pytest
 from flask import Flask, g, jsonify, request
 
 from backend.auth import (
+    CachingGoogleRequest,
     generate_jwt_token,
     require_auth,
     set_token_cookies,
@@ -156,6 +157,24 @@ class TestVerifyJWTToken:
         result = verify_jwt_token(token, secret)
         assert result is not None
 
+    def test_cached_token_still_expires(self):
+        """Test a token verified once is rejected after its expiry plus leeway."""
+        secret = 'secret'
+        exp = datetime.now(timezone.utc) + timedelta(minutes=5)
+        token = jwt.encode({'user_id': 'u1', 'exp': exp}, secret, algorithm='HS256')
+
+        assert verify_jwt_token(token, secret)['user_id'] == 'u1'
+        with patch('backend.auth.time.time', return_value=exp.timestamp() + 11):
+            assert verify_jwt_token(token, secret) is None
+
+    def test_returned_payload_is_a_copy(self):
+        """Test callers mutating a payload do not alter the cached one."""
+        token = generate_jwt_token({'user_id': 'u1', 'email': 'e@e.com'}, 'secret', '15m')
+
+        verify_jwt_token(token, 'secret')['user_id'] = 'changed'
+
+        assert verify_jwt_token(token, 'secret')['user_id'] == 'u1'
+
     def test_returns_none_for_token_missing_required_fields(self):
         """Test tokens missing required fields return None."""
         secret = 'secret'
@@ -381,3 +400,40 @@ class TestRequireAuth:
 
                 result = require_auth()
                 assert result is None
+
+
+class TestCachingGoogleRequest:
+    """Tests for the certificate-caching Google transport."""
+
+    @staticmethod
+    def _session(cache_control):
+        session = MagicMock()
+        session.request.return_value = Mock(status_code=200, content=b'{"kid": "cert"}',
+                                            headers={'cache-control': cache_control})
+        return session
+
+    def test_reuses_certs_within_max_age(self):
+        """Test repeated certificate GETs are served from the cache until max-age passes."""
+        session = self._session('public, max-age=100')
+        transport = CachingGoogleRequest(session)
+
+        with patch('backend.auth.time.monotonic', return_value=0):
+            first = transport('https://certs')
+            second = transport('https://certs')
+        with patch('backend.auth.time.monotonic', return_value=101):
+            transport('https://certs')
+
+        assert second is first
+        assert first.data == b'{"kid": "cert"}'
+        assert session.request.call_count == 2
+
+    def test_uncacheable_responses_are_refetched(self):
+        """Test responses without max-age and non-GET requests always hit the network."""
+        session = self._session('no-store')
+        transport = CachingGoogleRequest(session)
+
+        transport('https://certs')
+        transport('https://certs')
+        transport('https://token', method='POST', body=b'code=1')
+
+        assert session.request.call_count == 3
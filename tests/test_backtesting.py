@@ -0,0 +1,128 @@
+"""
+Unit tests for the backtesting engine.
+
+Tests indicator calculations in BacktestEngine against straightforward
+reference implementations.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.backtesting import BacktestEngine, apply_sebi_lag, get_data_lag_date
+
+
+@pytest.fixture
+def ohlcv_df():
+    """Create a synthetic daily OHLCV frame."""
+    rng = np.random.default_rng(42)
+    periods = 300
+    close = 100 + np.cumsum(rng.normal(0, 1, periods))
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.5, periods),
+        'High': close + 1.0,
+        'Low': close - 1.0,
+        'Close': close,
+        'Volume': rng.integers(1_000, 10_000, periods).astype(float)
+    }, index=pd.date_range('2020-01-01', periods=periods, freq='B'))
+
+
+class TestBacktestEngineInit:
+    """Tests for engine construction."""
+
+    def test_input_frame_is_not_modified(self, ohlcv_df):
+        """Test the engine shares OHLCV data without renaming or adding columns on the caller's frame."""
+        original_columns = list(ohlcv_df.columns)
+        engine = BacktestEngine(ohlcv_df)
+        engine.run_strategy('composite')
+
+        assert list(ohlcv_df.columns) == original_columns
+        assert 'close' in engine.df.columns
+
+
+class TestApplySebiLag:
+    """Tests for the SEBI data lag filter."""
+
+    @pytest.mark.parametrize('tz', [None, 'Asia/Kolkata'])
+    def test_drops_rows_after_lag_date(self, tz):
+        """Test only rows on or before the lag date are kept, for naive and tz-aware indexes."""
+        index = pd.date_range(pd.Timestamp.now().normalize() - pd.Timedelta(days=60), periods=60, freq='D', tz=tz)
+        df = pd.DataFrame({'Close': np.arange(60.0)}, index=index)
+        lag_ts = pd.Timestamp(get_data_lag_date())
+        if tz:
+            lag_ts = lag_ts.tz_localize(tz)
+
+        result = apply_sebi_lag(df)
+
+        pd.testing.assert_frame_equal(result, df[df.index <= lag_ts])
+
+    def test_new_columns_do_not_reach_input(self, ohlcv_df):
+        """Test adding a column to the lagged frame leaves the source frame untouched."""
+        result = apply_sebi_lag(ohlcv_df)
+        result['MA5'] = result['Close'].rolling(5).mean()
+
+        assert 'MA5' not in ohlcv_df.columns
+
+
+class TestAddRsi:
+    """Tests for RSI calculation."""
+
+    def test_rsi_uses_wilder_smoothing(self, ohlcv_df):
+        """Test RSI matches Wilder's recursion seeded with a simple average."""
+        window = 14
+        engine = BacktestEngine(ohlcv_df)
+        engine.add_rsi(window)
+
+        delta = np.diff(ohlcv_df['Close'].to_numpy())
+        gains, losses = np.maximum(delta, 0), np.maximum(-delta, 0)
+        avg_gain, avg_loss = gains[:window].mean(), losses[:window].mean()
+        expected = [np.nan] * window + [100 - 100 / (1 + avg_gain / avg_loss)]
+        for gain, loss in zip(gains[window:], losses[window:]):
+            avg_gain = (avg_gain * (window - 1) + gain) / window
+            avg_loss = (avg_loss * (window - 1) + loss) / window
+            expected.append(100 - 100 / (1 + avg_gain / avg_loss))
+
+        np.testing.assert_allclose(engine.df['rsi'].to_numpy(), expected, equal_nan=True)
+
+    def test_rsi_is_100_when_price_only_rises(self):
+        """Test RSI saturates at 100 with no losing bars."""
+        close = np.arange(1.0, 31.0)
+        df = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0},
+                          index=pd.date_range('2020-01-01', periods=len(close)))
+        engine = BacktestEngine(df)
+        engine.add_rsi(14)
+
+        assert engine.df['rsi'].iloc[-1] == 100
+
+
+class TestRunStrategy:
+    """Tests for strategy execution."""
+
+    def test_short_history_leaves_long_windows_nan(self, ohlcv_df):
+        """Test indicators with windows longer than the data are all NaN rather than erroring."""
+        engine = BacktestEngine(ohlcv_df.iloc[:120])
+        result = engine.run_strategy('golden_cross')
+
+        assert result['sma_long'].isna().all()
+        assert (result['signal'] == 0).all()
+
+    def test_only_required_indicators_are_computed(self, ohlcv_df):
+        """Test golden_cross skips indicators it never reads but keeps ATR for sizing."""
+        engine = BacktestEngine(ohlcv_df)
+        result = engine.run_strategy('golden_cross')
+
+        assert {'sma_short', 'sma_long', 'atr'} <= set(result.columns)
+        assert not {'rsi', 'macd', 'adx', 'bb_upper'} & set(result.columns)
+
+    def test_unknown_strategy_raises(self, ohlcv_df):
+        """Test an unknown strategy name is rejected."""
+        with pytest.raises(ValueError, match='Unknown strategy'):
+            BacktestEngine(ohlcv_df).run_strategy('not_a_strategy')
+
+    @pytest.mark.parametrize('strategy', ['golden_cross', 'macd', 'composite', 'momentum', 'mean_reversion'])
+    def test_polars_backend_matches_numpy(self, ohlcv_df, strategy):
+        """Test the Polars indicator backend produces the same columns and signals."""
+        pytest.importorskip('polars')
+        expected = BacktestEngine(ohlcv_df).run_strategy(strategy)
+        result = BacktestEngine(ohlcv_df, backend='polars').run_strategy(strategy)
+
+        pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
@@ -0,0 +1,79 @@
+"""
+Unit tests for configuration module.
+
+Tests helpers on the Config class, database URI normalization and secret validation.
+"""
+import pytest
+
+from backend import config
+from backend.config import Config
+
+
+class TestParseTimeToSeconds:
+    """Tests for Config.parse_time_to_seconds."""
+
+    @pytest.mark.parametrize('time_str, expected', [
+        ('30s', 30),
+        ('15m', 900),
+        ('2h', 7200),
+        ('7d', 604800),
+    ])
+    def test_parses_unit_suffixes(self, time_str, expected):
+        """Test each supported unit suffix is converted to seconds."""
+        assert Config.parse_time_to_seconds(time_str) == expected
+
+    @pytest.mark.parametrize('time_str', ['15', '3w', ''])
+    def test_unknown_unit_defaults_to_15_minutes(self, time_str):
+        """Test strings without a known unit fall back to 900 seconds."""
+        assert Config.parse_time_to_seconds(time_str) == 900
+
+
+class TestBuildDbUri:
+    """Tests for DATABASE_URL normalization."""
+
+    def test_normalizes_pasted_postgres_url(self, monkeypatch):
+        """Test quotes are stripped, the scheme is rewritten and sslmode is required."""
+        monkeypatch.setattr(config, '_DATABASE_URL', ' "postgres://user:pw@host/db" ')
+        assert config._build_db_uri('/data') == 'postgresql://user:pw@host/db?sslmode=require'
+
+    def test_keeps_existing_sslmode(self, monkeypatch):
+        """Test an explicit sslmode is left untouched."""
+        monkeypatch.setattr(config, '_DATABASE_URL', 'postgresql://host/db?sslmode=disable')
+        assert config._build_db_uri('/data') == 'postgresql://host/db?sslmode=disable'
+
+    def test_adds_sslmode_alongside_other_params(self, monkeypatch):
+        """Test sslmode is only treated as present when it is an actual query key."""
+        monkeypatch.setattr(config, '_DATABASE_URL', 'postgresql://host/db?application_name=sslmode_probe')
+        assert config._build_db_uri('/data') == (
+            'postgresql://host/db?application_name=sslmode_probe&sslmode=require'
+        )
+
+    def test_falls_back_to_sqlite_in_data_dir(self, monkeypatch):
+        """Test a missing DATABASE_URL uses portfolio.db in the data directory."""
+        monkeypatch.setattr(config, '_DATABASE_URL', None)
+        assert config._build_db_uri('/data') == 'sqlite:////data/portfolio.db'
+
+
+class TestValidateSecrets:
+    """Tests for Config.validate_secrets."""
+
+    def test_reports_missing_secrets_in_one_record(self, monkeypatch, caplog):
+        """Test every missing secret is named in a single error record."""
+        monkeypatch.setattr(Config, 'ACCESS_TOKEN_JWT_SECRET', None)
+        monkeypatch.setattr(Config, 'REFRESH_TOKEN_JWT_SECRET', None)
+        monkeypatch.setattr(Config, 'GOOGLE_CLIENT_ID', 'client-id')
+        monkeypatch.setattr(Config, 'GOOGLE_CLIENT_SECRET', 'client-secret')
+
+        with caplog.at_level('ERROR', logger='backend.config'):
+            assert Config.validate_secrets() is False
+
+        assert len(caplog.records) == 1
+        message = caplog.records[0].getMessage()
+        assert 'ACCESS_TOKEN_JWT_SECRET' in message and 'REFRESH_TOKEN_JWT_SECRET' in message
+        assert 'GOOGLE_CLIENT_ID' not in message
+
+    def test_returns_true_when_all_secrets_set(self, monkeypatch):
+        """Test validation passes when every required secret is present."""
+        for name in config._REQUIRED_SECRETS:
+            monkeypatch.setattr(Config, name, 'set')
+        assert Config.validate_secrets() is True
@@ -19,6 +19,7 @@ from backend.data_compliance import (
     DataComplianceManager,
     get_intraday_parquet_path,
     get_intraday_window,
+    get_parquet_path,
     load_stock_data_with_compliance,
 )
 
@@ -121,6 +122,24 @@ class TestGetIntradayParquetPath:
             assert '0-9' in str(path)
 
 
+class TestGetParquetPath:
+    """Tests for daily parquet path resolution."""
+
+    def test_finds_new_files_and_remembers_existing_ones(self, temp_intraday_dir):
+        """Test a file created after a miss is found, then resolved without another exists() check."""
+        with patch('backend.data_compliance.DATA_DIRECTORY', str(temp_intraday_dir)):
+            assert get_parquet_path('NEWCO.NS') is None
+
+            (temp_intraday_dir / 'N').mkdir()
+            (temp_intraday_dir / 'N' / 'NEWCO.NS.parquet').write_bytes(b'')
+            path = get_parquet_path('NEWCO.NS')
+            assert path == os.path.join(str(temp_intraday_dir), 'N', 'NEWCO.NS.parquet')
+
+            with patch('backend.data_compliance.os.path.exists') as mock_exists:
+                assert get_parquet_path('NEWCO.NS') == path
+            mock_exists.assert_not_called()
+
+
 class TestDataComplianceManager:
     """Tests for DataComplianceManager class."""
 
@@ -132,6 +151,14 @@ class TestDataComplianceManager:
         diff = abs((lag_date - expected).total_seconds())
         assert diff < 60
 
+    def test_get_current_date_with_lag_is_reused_briefly(self, compliance_manager):
+        """Test the lag date is computed once and reused until the cache window passes."""
+        first = compliance_manager.get_current_date_with_lag()
+        assert compliance_manager.get_current_date_with_lag() is first
+
+        with patch('backend.data_compliance.monotonic', return_value=compliance_manager._lag_date_at + 61):
+            assert compliance_manager.get_current_date_with_lag() is not first
+
     def test_filter_data_with_lag_filters_recent_data(self, compliance_manager):
         """Test filter_data_with_lag removes data newer than SEBI lag."""
         # Create DataFrame with dates spanning SEBI boundary
@@ -151,6 +178,23 @@ class TestDataComplianceManager:
         sebi_date = compliance_manager.get_current_date_with_lag()
         assert filtered.index.max() <= sebi_date
 
+    def test_filter_data_with_lag_matches_mask_for_sorted_and_unsorted_index(self, compliance_manager):
+        """Test sorted and unsorted indexes keep exactly the rows on or before the lag date."""
+        dates = pd.date_range(
+            start=datetime.now() - timedelta(days=SEBI_LAG_DAYS + 20),
+            end=datetime.now(),
+            freq='D'
+        )
+        df = pd.DataFrame({'close': range(len(dates))}, index=dates)
+        sebi_date = compliance_manager.get_current_date_with_lag()
+        expected = df[df.index <= sebi_date]
+
+        pd.testing.assert_frame_equal(compliance_manager.filter_data_with_lag(df), expected)
+        shuffled = df.sample(frac=1, random_state=0)
+        pd.testing.assert_frame_equal(
+            compliance_manager.filter_data_with_lag(shuffled).sort_index(), expected, check_freq=False
+        )
+
     def test_filter_data_with_lag_handles_empty_dataframe(self, compliance_manager):
         """Test filter_data_with_lag handles empty DataFrame."""
         df = pd.DataFrame()
@@ -338,6 +382,75 @@ class TestIntradayWindowCompliance:
         assert loaded.index.min() > window_end
 
 
+class TestCheckDataAvailability:
+    """Tests for the data availability check."""
+
+    def test_reads_date_range_from_parquet_footer(self, compliance_manager, sample_intraday_file,
+                                                  temp_intraday_dir):
+        """Test the reported range matches the file's index without decoding its data."""
+        start = datetime(2023, 1, 2, 9, 15)
+        file_path = sample_intraday_file('RANGE.NS', start, periods=50)
+        compliance_manager.data_dir = str(temp_intraday_dir)
+
+        with patch('backend.data_compliance.pd.read_parquet') as mock_read:
+            info = compliance_manager.check_data_availability()
+
+        mock_read.assert_not_called()
+        df = pd.read_parquet(file_path)
+        assert info['available'] is True
+        assert info['first_date'] == df.index.min().strftime('%Y-%m-%d')
+        assert info['last_date'] == df.index.max().strftime('%Y-%m-%d')
+
+    def test_falls_back_to_reading_string_dates(self, compliance_manager, temp_intraday_dir):
+        """Test files whose dates are stored as strings are still read."""
+        subdir = temp_intraday_dir / 'S'
+        subdir.mkdir()
+        pd.DataFrame({
+            'date': ['2022-03-01', '2022-03-02', '2022-03-03'],
+            'close': [1.0, 2.0, 3.0]
+        }).to_parquet(subdir / 'STR.NS.parquet')
+        compliance_manager.data_dir = str(temp_intraday_dir)
+
+        info = compliance_manager.check_data_availability()
+
+        assert info['first_date'] == '2022-03-01'
+        assert info['last_date'] == '2022-03-03'
+
+    def test_falls_back_to_reading_string_index(self, compliance_manager, temp_intraday_dir):
+        """Test a stored string index is read back without decoding the price columns."""
+        subdir = temp_intraday_dir / 'I'
+        subdir.mkdir()
+        pd.DataFrame(
+            {'close': [1.0, 2.0]},
+            index=pd.Index(['2021-05-03', '2021-05-04'], name='Date')
+        ).to_parquet(subdir / 'IDX.NS.parquet')
+        compliance_manager.data_dir = str(temp_intraday_dir)
+
+        with patch('backend.data_compliance.pd.read_parquet', wraps=pd.read_parquet) as mock_read:
+            info = compliance_manager.check_data_availability()
+
+        assert mock_read.call_args.kwargs['columns'] == []
+        assert info['first_date'] == '2021-05-03'
+        assert info['last_date'] == '2021-05-04'
+
+    def test_uses_result_shared_by_another_worker(self, compliance_manager, sample_intraday_file,
+                                                  temp_intraday_dir):
+        """Test a result found in the shared cache is returned without touching the file."""
+        sample_intraday_file('SHARED.NS', datetime(2023, 1, 2, 9, 15))
+        compliance_manager.data_dir = str(temp_intraday_dir)
+        shared = {'available': True, 'first_date': '2001-01-01', 'last_date': '2001-12-31'}
+
+        with patch('backend.data_compliance.DataCache') as mock_cache, \
+             patch.object(DataComplianceManager, '_shared_cache_ready', return_value=True), \
+             patch('backend.data_compliance._parquet_date_range') as mock_range:
+            mock_cache.get.return_value = shared
+            info = compliance_manager.check_data_availability()
+
+        assert info == shared
+        mock_range.assert_not_called()
+        mock_cache.set.assert_not_called()
+
+
 class TestGetInformaticsHtml:
     """Tests for generating HTML informatics."""
 
@@ -0,0 +1,196 @@
+"""
+Unit tests for the Monte Carlo simulation engine.
+
+Tests the simulation methods and aggregate analysis in MonteCarloEngine.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.mc_engine import MonteCarloEngine, SimulationCache, SimulationConfig
+
+
+@pytest.fixture
+def trades():
+    """Create a small list of backtest trades."""
+    pnls = [5.0, -2.0, 3.5, -1.0, 8.0, -4.5, 2.0, 1.5, -3.0, 6.0]
+    return [
+        {
+            'entry_price': 100.0,
+            'exit_price': 100.0 * (1 + p / 100),
+            'days_held': 5,
+            'pnl_pct': p,
+            'result': 'Win' if p > 0 else 'Loss'
+        }
+        for p in pnls
+    ]
+
+
+@pytest.fixture
+def engine(trades):
+    """Create a seeded engine with trades and daily returns loaded."""
+    engine = MonteCarloEngine(seed=7)
+    engine.set_trades(trades)
+    rng = np.random.default_rng(0)
+    engine.set_daily_returns(pd.Series(100 * np.cumprod(1 + rng.normal(0, 0.01, 250))))
+    return engine
+
+
+def _reference_equity_curve(pnls):
+    """Build an equity curve by compounding one return at a time."""
+    curve = [100000.0]
+    for pnl in pnls:
+        curve.append(curve[-1] * (1 + pnl))
+    return np.array(curve)
+
+
+class TestSimulationMethods:
+    """Tests for the individual simulation methods."""
+
+    def test_position_shuffle_preserves_final_value(self, engine, trades):
+        """Test reordering trades never changes the compounded final value."""
+        expected = _reference_equity_curve([t['pnl_pct'] / 100 for t in trades])[-1]
+        results = engine.run_position_shuffle(50)
+
+        assert len(results) == 50
+        np.testing.assert_allclose(results.final_value, expected)
+        assert (results.win_rate == 60.0).all()
+
+    def test_equity_curve_compounds_returns(self, engine):
+        """Test each bootstrap equity curve starts at capital and reaches the final value."""
+        for result in engine.run_bootstrap(20).to_results():
+            curve = np.asarray(result.equity_curve)
+            assert curve[0] == 100000.0
+            assert curve[-1] == pytest.approx(result.final_value)
+            assert result.total_return_pct == pytest.approx((result.final_value / 100000.0 - 1) * 100)
+
+    def test_max_drawdown_matches_reference(self, engine):
+        """Test reported drawdown matches a running-peak computation on the curve."""
+        for result in engine.run_position_shuffle(20).to_results():
+            curve = np.asarray(result.equity_curve)
+            peak = np.maximum.accumulate(curve)
+            assert result.max_drawdown_pct == pytest.approx(np.max((peak - curve) / peak) * 100)
+
+    def test_sharpe_matches_equity_curve(self, engine):
+        """Test Sharpe taken from sampled returns equals Sharpe recomputed from each curve."""
+        for result in engine.run_bootstrap(20).to_results():
+            assert result.sharpe_ratio == pytest.approx(
+                engine._calculate_sharpe(np.asarray(result.equity_curve))
+            )
+
+    def test_only_leading_simulations_keep_curves(self, engine):
+        """Test equity curves are kept (downsampled) for the first 100 simulations only."""
+        results = engine.run_return_permutation(150).to_results()
+
+        assert all(r.equity_curve is not None and len(r.equity_curve) <= 126 for r in results[:100])
+        assert all(r.equity_curve is None for r in results[100:])
+
+    def test_batches_reuse_buffers_without_leaking(self, engine, monkeypatch):
+        """Test results split across batches sharing one buffer match a single-batch run."""
+        single = engine.run_bootstrap(30, rng=np.random.default_rng(3))
+        monkeypatch.setattr('backend.mc_engine._BATCH_MAX_ELEMENTS', 4 * 11)
+        batched = engine.run_bootstrap(30, rng=np.random.default_rng(3))
+
+        np.testing.assert_allclose(batched.final_value, single.final_value)
+        np.testing.assert_allclose(batched.max_drawdown_pct, single.max_drawdown_pct)
+        assert batched.equity_curves == single.equity_curves
+
+    def test_set_trades_ingests_arrays(self, engine, trades):
+        """Test trades are stored as fractional P&L and win-flag arrays."""
+        np.testing.assert_allclose(engine.trade_pnls, [t['pnl_pct'] / 100 for t in trades])
+        assert engine.trade_wins.tolist() == [t['result'] == 'Win' for t in trades]
+
+    def test_no_trades_returns_empty(self):
+        """Test simulations without input data produce no results."""
+        engine = MonteCarloEngine(seed=1)
+        assert len(engine.run_position_shuffle(10)) == 0
+        assert len(engine.run_bootstrap(10)) == 0
+        assert len(engine.run_return_permutation(10)) == 0
+
+
+class TestRunAnalysis:
+    """Tests for the combined analysis."""
+
+    def test_same_seed_is_reproducible(self, trades):
+        """Test two engines with the same seed produce identical analyses."""
+        analyses = []
+        for _ in range(2):
+            engine = MonteCarloEngine(seed=123)
+            engine.set_trades(trades)
+            analyses.append(engine.run_analysis(SimulationConfig(num_simulations=300)))
+
+        assert analyses[0].percentile_50 == analyses[1].percentile_50
+        assert analyses[0].return_distribution == analyses[1].return_distribution
+
+    def test_summary_statistics(self, engine):
+        """Test percentiles, VaR and CVaR are consistent with the simulated returns."""
+        analysis = engine.run_analysis(SimulationConfig(num_simulations=600))
+        returns = analysis.simulation_returns
+
+        assert analysis.num_trials == len(returns) == 600
+        assert len(analysis.simulations) == 100
+        assert analysis.percentile_5 <= analysis.percentile_50 <= analysis.percentile_95
+        assert analysis.var_95 == analysis.percentile_5
+        assert analysis.cvar_95 <= analysis.var_95
+        assert analysis.return_distribution == np.histogram(returns, bins=20)[0].tolist()
+        assert analysis.mean_return == pytest.approx(returns.mean())
+        np.testing.assert_allclose(
+            [analysis.percentile_5, analysis.percentile_50, analysis.percentile_95],
+            np.percentile(returns, [5, 50, 95])
+        )
+        assert analysis.cvar_95 == pytest.approx(returns[returns <= analysis.var_95].mean())
+
+    def test_p_value_counts_simulations_at_or_above_original(self, engine):
+        """Test the p-value is the share of simulated returns at least the strategy's return."""
+        analysis = engine.run_analysis(SimulationConfig(num_simulations=600))
+        original = float(np.median(analysis.simulation_returns))
+
+        analysis = engine.calculate_p_values(analysis, original, 1.0)
+
+        expected = np.mean(analysis.simulation_returns >= original) * 100
+        assert analysis.p_value_strategy_vs_random == pytest.approx(expected)
+
+
+class TestSimulationCache:
+    """Tests for simulation result caching."""
+
+    def test_key_depends_on_pnls_returns_and_config(self, engine, trades):
+        """Test keys are stable for equal inputs and change with P&L, daily returns or config."""
+        cache = SimulationCache()
+        returns = engine.daily_returns
+        config = SimulationConfig(num_simulations=300, seed=5)
+        key = cache._get_cache_key(trades, returns, config)
+
+        assert key == cache._get_cache_key([dict(t) for t in trades], returns.copy(),
+                                           SimulationConfig(num_simulations=300, seed=5))
+        assert key != cache._get_cache_key(trades[:-1], returns, config)
+        assert key != cache._get_cache_key(trades, returns[:-1], config)
+        assert key != cache._get_cache_key(trades, returns * 1.01, config)
+        assert key != cache._get_cache_key(trades, returns, SimulationConfig(num_simulations=300, seed=6))
+
+    def test_any_integer_seed_builds_a_key(self, engine, trades, tmp_path):
+        """Test negative and wider-than-64-bit seeds hash instead of raising."""
+        cache = SimulationCache(cache_dir=str(tmp_path))
+        keys = {cache._get_cache_key(trades, engine.daily_returns, SimulationConfig(seed=seed))
+                for seed in (-1, 2**64, 2**64 + 1)}
+
+        assert len(keys) == 3
+        assert cache.get(trades, engine.daily_returns, SimulationConfig(seed=-1)) is None
+
+    def test_round_trip_restores_analysis(self, engine, trades, tmp_path):
+        """Test a stored analysis is read back with its returns and sample simulations intact."""
+        cache = SimulationCache(cache_dir=str(tmp_path))
+        config = SimulationConfig(num_simulations=200, seed=5)
+        analysis = engine.run_analysis(config)
+
+        returns = engine.daily_returns
+        assert cache.get(trades, returns, config) is None
+        cache.set(trades, returns, config, analysis)
+        cached = cache.get(trades, returns, config)
+
+        np.testing.assert_array_equal(cached.simulation_returns, analysis.simulation_returns)
+        assert cached.simulations == analysis.simulations
+        assert cached.to_dict()['statistics'] == analysis.to_dict()['statistics']
+        assert cached.return_distribution == analysis.return_distribution
+        assert cache.get(trades, returns, SimulationConfig(num_simulations=200, seed=6)) is None
+        assert cache.get(trades, returns[1:], config) is None
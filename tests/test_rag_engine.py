@@ -0,0 +1,250 @@
+"""
+Unit tests for the RAG engine.
+
+Tests document storage and search in RAGEngine against the in-memory
+fake_redis client, with embeddings patched to fixed vectors.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from backend import rag_engine as rag_module
+from backend.rag_engine import RAGEngine
+
+
+VECTORS = {
+    'rsi': [1.0, 0.0, 0.0],
+    'macd': [0.0, 1.0, 0.0],
+    'risk': [0.8, 0.6, 0.0],
+}
+
+
+@pytest.fixture
+def engine(fake_redis, monkeypatch):
+    """Create an engine whose embeddings are looked up from VECTORS by text."""
+    engine = RAGEngine()
+    engine.backend = 'fastembed'
+    engine.similarity_threshold = 0.5
+    monkeypatch.setattr(engine, 'embed_text', lambda text: VECTORS.get(text))
+    monkeypatch.setattr(engine, 'embed_query', lambda text: VECTORS.get(text))
+    for doc_id in VECTORS:
+        assert engine.add_document(doc_id, doc_id, title=doc_id.upper())
+    return engine
+
+
+class TestSearch:
+    """Tests for similarity search."""
+
+    def test_returns_ranked_matches_above_threshold(self, engine):
+        """Test results are sorted by similarity and exclude documents below the threshold."""
+        results = engine.search('rsi', top_k=3)
+
+        assert [r['id'] for r in results] == ['rsi', 'risk']
+        assert results[0]['similarity'] == pytest.approx(1.0)
+        assert results[1]['similarity'] == pytest.approx(0.8)
+        assert results[0]['title'] == 'RSI'
+
+    def test_bytes_replies_are_parsed(self, engine, fake_redis):
+        """Test search works when the client returns raw bytes (no decode_responses)."""
+        fake_redis.decode_responses = False
+
+        results = engine.search('macd', top_k=3)
+
+        assert [r['id'] for r in results] == ['macd', 'risk']
+        assert isinstance(results[0]['id'], str)
+
+    def test_index_is_reloaded_only_after_writes(self, engine, fake_redis):
+        """Test repeat searches reuse the loaded index until a document is added or deleted."""
+        engine.search('rsi')
+        fake_redis.calls.clear()
+        engine.search('macd')
+        assert 'scan' not in fake_redis.calls
+        assert fake_redis.calls.count('mget') == 1  # content of the hits only
+
+        engine.delete_document('risk')
+        results = engine.search('rsi', top_k=3)
+        assert [r['id'] for r in results] == ['rsi']
+        assert 'scan' in fake_redis.calls
+
+    def test_matrix_ranking_matches_pure_python(self, engine):
+        """Test the vectorized ranking agrees with the per-document cosine fallback."""
+        rng = np.random.default_rng(0)
+        docs = [{'embedding': rng.normal(size=8).tolist()} for _ in range(40)]
+        query = rng.normal(size=8).tolist()
+        engine.similarity_threshold = 0.1
+
+        fast = engine._rank(query, docs, rag_module._normalized_matrix([d['embedding'] for d in docs]), 5)
+        slow = engine._rank(query, docs, None, 5)
+
+        assert [i for i, _ in fast] == [i for i, _ in slow]
+        np.testing.assert_allclose([s for _, s in fast], [s for _, s in slow], rtol=1e-5)
+
+    def test_vectors_are_stored_apart_from_content(self, engine, fake_redis):
+        """Test the index loads only vec:* records and fetches content for the hits."""
+        fake_redis.calls.clear()
+        engine._index_version = None
+        results = engine.search('rsi')
+
+        assert 'content' not in fake_redis.store['vec:rsi']
+        assert 'embedding' not in fake_redis.store['doc:rsi']
+        assert results[0]['content'] == 'rsi'
+
+    def test_legacy_documents_without_vec_records_are_searchable(self, fake_redis):
+        """Test documents stored with the embedding inside doc:{id} are still found."""
+        fake_redis.set('doc:old', json.dumps({'content': 'old text', 'title': 'Old',
+                                             'category': 'general', 'embedding': [1.0, 0.0, 0.0]}))
+        engine = RAGEngine()
+        engine.backend = 'fastembed'
+        engine.similarity_threshold = 0.5
+        engine.embed_query = lambda text: [1.0, 0.0, 0.0]
+
+        results = engine.search('anything')
+
+        assert [(r['id'], r['content']) for r in results] == [('old', 'old text')]
+
+    def test_legacy_documents_survive_new_adds(self, fake_redis):
+        """Test legacy doc:{id} records stay indexed after a vec:* record is written."""
+        fake_redis.set('doc:old', json.dumps({'content': 'old text', 'title': 'Old',
+                                             'category': 'general', 'embedding': [1.0, 0.0, 0.0]}))
+        engine = RAGEngine()
+        engine.backend = 'fastembed'
+        engine.similarity_threshold = 0.5
+        engine.embed_text = lambda text: [0.0, 1.0, 0.0]
+        engine.embed_query = lambda text: [1.0, 0.0, 0.0]
+
+        assert engine.add_document('new', 'new text')
+        results = engine.search('anything')
+
+        assert [r['id'] for r in results] == ['old']
+        assert engine.get_stats()['document_count'] == 2
+
+    def test_query_buffer_is_reused_per_thread(self, engine):
+        """Test repeated searches write the query into the same per-thread buffer."""
+        engine.search('rsi')
+        buffer = engine._local.query_buf
+        results = engine.search('macd', top_k=3)
+
+        assert engine._local.query_buf is buffer
+        assert [r['id'] for r in results] == ['macd', 'risk']
+
+    def test_clear_index_empties_results(self, engine):
+        """Test clearing the index removes every document from search results."""
+        engine.search('rsi')
+        assert engine.clear_index()
+        assert engine.search('rsi') == []
+
+
+    def test_assemble_context_lists_docs_between_markers(self, engine):
+        """Test the context block numbers each retrieved document between the header and footer."""
+        context = engine.assemble_context('rsi', engine.search('rsi', top_k=3))
+
+        assert context == (
+            "\n=== RELEVANT KNOWLEDGE BASE ===\n\n"
+            "[1] RSI (Category: general, Relevance: 100.00%)\nrsi\n\n"
+            "[2] RISK (Category: general, Relevance: 80.00%)\nrisk\n\n"
+            "=== END KNOWLEDGE BASE ===\n"
+        )
+        assert engine.assemble_context('rsi', []) == ""
+
+
+class TestAddDocuments:
+    """Tests for bulk ingestion."""
+
+    def test_bulk_add_embeds_once_and_pipelines_writes(self, fake_redis, monkeypatch):
+        """Test a batch of documents makes one embedding call and one pipelined write batch."""
+        engine = RAGEngine()
+        engine.backend = 'fastembed'
+        engine.similarity_threshold = 0.5
+        batches = []
+        monkeypatch.setattr(engine, 'embed_texts', lambda texts: batches.append(texts) or [VECTORS.get(t) for t in texts])
+        monkeypatch.setattr(engine, 'embed_query', lambda text: VECTORS.get(text))
+
+        docs = [{'id': name, 'content': name, 'title': name.upper()} for name in [*VECTORS, 'unknown']]
+        assert engine.add_documents(docs) == 3
+
+        assert batches == [[*VECTORS, 'unknown']]
+        assert fake_redis.calls.count('execute') == 1
+        assert 'doc:unknown' not in fake_redis.store
+        assert [r['id'] for r in engine.search('macd', top_k=3)] == ['macd', 'risk']
+
+    def test_bulk_add_splits_into_embedding_batches(self, fake_redis, monkeypatch):
+        """Test documents are embedded and written in chunks of EMBEDDING_BATCH_SIZE."""
+        engine = RAGEngine()
+        engine.backend = 'fastembed'
+        batches = []
+        monkeypatch.setattr(rag_module.RedisConfig, 'EMBEDDING_BATCH_SIZE', 2)
+        monkeypatch.setattr(engine, 'embed_texts', lambda texts: batches.append(texts) or [VECTORS.get(t) for t in texts])
+
+        docs = [{'id': name, 'content': name} for name in [*VECTORS, 'unknown']]
+        assert engine.add_documents(docs) == 3
+
+        assert batches == [['rsi', 'macd'], ['risk', 'unknown']]
+        assert fake_redis.calls.count('execute') == 2
+
+
+class TestEmbeddingQuantization:
+    """Tests for stored embedding precision."""
+
+    @pytest.mark.parametrize('quant, tolerance', [('fp32', 0), ('fp16', 1e-3), ('int8', 1e-2)])
+    def test_round_trip_within_precision(self, quant, tolerance):
+        """Test each storage precision decodes back to the original vector."""
+        embedding = [0.12, -0.5, 0.33, 0.0, 0.9]
+        decoded = rag_module._decode_embedding(rag_module._encode_embedding(embedding, quant))
+
+        assert decoded == pytest.approx(embedding, abs=tolerance)
+
+    def test_quantized_documents_are_searchable(self, fake_redis, monkeypatch):
+        """Test documents stored as int8 are found with the same ranking."""
+        engine = RAGEngine()
+        engine.backend = 'fastembed'
+        engine.similarity_threshold = 0.5
+        engine.vector_quant = 'int8'
+        monkeypatch.setattr(engine, 'embed_text', lambda text: VECTORS.get(text))
+        monkeypatch.setattr(engine, 'embed_query', lambda text: VECTORS.get(text))
+        for doc_id in VECTORS:
+            engine.add_document(doc_id, doc_id)
+
+        assert 'embedding' not in fake_redis.store['doc:rsi']
+        assert '"embedding_i8":' in fake_redis.store['vec:rsi']
+        assert [r['id'] for r in engine.search('rsi', top_k=3)] == ['rsi', 'risk']
+
+
+class TestQueryEmbeddingCache:
+    """Tests for cached query embeddings."""
+
+    def test_repeat_query_skips_model(self, fake_redis, monkeypatch):
+        """Test a repeated query is served from the embedding cache without a model call."""
+        engine = RAGEngine()
+        engine.backend = 'fastembed'
+        calls = []
+        monkeypatch.setattr(engine, '_embed_query_uncached', lambda q: calls.append(q) or [0.5, -0.25, 1.0])
+
+        first = engine.embed_query('what is rsi')
+        second = engine.embed_query('what is rsi')
+
+        assert calls == ['what is rsi']
+        assert second == pytest.approx(first)
+        assert any(key.startswith('emb:fastembed:q:') for key in fake_redis.store)
+
+
+class TestPcaProjection:
+    """Tests for optional PCA dimension reduction."""
+
+    def test_fit_and_search_with_projection(self, engine, fake_redis, tmp_path, monkeypatch):
+        """Test a fitted projection reduces stored vectors and keeps the nearest match."""
+        path = str(tmp_path / 'pca.npz')
+        assert engine.fit_pca(2, path)
+
+        monkeypatch.setattr(rag_module.RedisConfig, 'VECTOR_PCA_PATH', path)
+        projected = RAGEngine()
+        projected.backend = 'fastembed'
+        projected.similarity_threshold = 0.5
+        monkeypatch.setattr(projected, 'embed_text', lambda text: VECTORS.get(text))
+        monkeypatch.setattr(projected, 'embed_query', lambda text: VECTORS.get(text))
+        for doc_id in VECTORS:
+            projected.add_document(doc_id, doc_id)
+
+        assert projected.vector_dim == 2
+        assert len(json.loads(fake_redis.store['vec:rsi'])['embedding']) == 2
+        assert projected.search('macd')[0]['id'] == 'macd'
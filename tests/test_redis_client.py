@@ -0,0 +1,159 @@
+"""
+Unit tests for the Redis client helpers and cache classes.
+
+Tests run against the in-memory fake_redis client from conftest.
+"""
+import fnmatch
+
+from backend.redis_client import (ChatCache, DataCache, RateLimiter, RedisConfig, SessionManager,
+                                  UserCache, redis_client, scan_keys, unlink_keys)
+
+
+class CursorOnlyRedis:
+    """Client exposing SCAN but not scan_iter, like the Upstash REST client."""
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def scan(self, cursor, match='*', count=10):
+        matching = [k for k in self.keys if fnmatch.fnmatch(k, match)]
+        page = matching[cursor:cursor + 2]
+        next_cursor = cursor + 2 if cursor + 2 < len(matching) else 0
+        return next_cursor, page
+
+
+class PingCounter:
+    """Client that only counts PINGs."""
+
+    def __init__(self):
+        self.pings = 0
+
+    def ping(self):
+        self.pings += 1
+        return True
+
+
+class TestGetClient:
+    """Tests for connection health checks."""
+
+    def test_ping_only_after_interval(self, monkeypatch):
+        """Test get_client pings once per PING_INTERVAL instead of on every call."""
+        client = PingCounter()
+        clock = [100.0]
+        monkeypatch.setattr('backend.redis_client.time.monotonic', lambda: clock[0])
+        monkeypatch.setattr(redis_client, '_client', client)
+        monkeypatch.setattr(redis_client, '_last_ping', 0.0)
+
+        for _ in range(3):
+            assert redis_client.get_client() is client
+        clock[0] += RedisConfig.PING_INTERVAL
+        redis_client.get_client()
+
+        assert client.pings == 2
+
+
+class TestKeyHelpers:
+    """Tests for SCAN-based key collection and batched UNLINK."""
+
+    def test_scan_keys_walks_cursor_without_scan_iter(self):
+        """Test keys are collected across SCAN pages when scan_iter is unavailable."""
+        client = CursorOnlyRedis(['doc:1', 'doc:2', 'chat:1', 'doc:3', 'doc:4', 'doc:5'])
+
+        assert scan_keys(client, 'doc:*') == ['doc:1', 'doc:2', 'doc:3', 'doc:4', 'doc:5']
+
+    def test_unlink_keys_batches(self, fake_redis):
+        """Test keys are unlinked in batches of the given size."""
+        for i in range(5):
+            fake_redis.set(f'k:{i}', i)
+
+        assert unlink_keys(fake_redis, [f'k:{i}' for i in range(5)], batch_size=2) == 5
+        assert fake_redis.calls.count('unlink') == 3
+        assert fake_redis.store == {}
+
+
+class TestChatCache:
+    """Tests for chat response caching."""
+
+    def test_key_ignores_context_order_and_is_reused(self, fake_redis):
+        """Test keys are order-independent and a precomputed key is used for get and set."""
+        key = ChatCache.generate_key('q', {'a': 1, 'b': [1, 2]})
+
+        assert key == ChatCache.generate_key('q', {'b': [1, 2], 'a': 1})
+        assert key != ChatCache.generate_key('q', {'a': 2, 'b': [1, 2]})
+        assert len(key) == len('chat:cache:') + 64
+
+        ChatCache.set('q', {}, 'answer', key=key)
+        assert key in fake_redis.store
+        assert ChatCache.get('other query', {}, key=key) == 'answer'
+
+    def test_invalidate_pattern_removes_only_matching_keys(self, fake_redis):
+        """Test invalidation scans and unlinks chat entries without touching other keys."""
+        ChatCache.set('what is rsi', {'symbol': 'TCS.NS'}, 'answer')
+        fake_redis.set('doc:rsi', '{}')
+
+        ChatCache.invalidate_pattern()
+
+        assert list(fake_redis.store) == ['doc:rsi']
+        assert 'unlink' in fake_redis.calls
+
+    def test_get_parses_bytes_replies(self, fake_redis):
+        """Test cached responses are read back from a client returning raw bytes."""
+        fake_redis.decode_responses = False
+        ChatCache.set('what is rsi', {'symbol': 'TCS.NS'}, 'answer')
+
+        assert ChatCache.get('what is rsi', {'symbol': 'TCS.NS'}) == 'answer'
+
+
+class TestPayloadCaches:
+    """Tests for the session, user and data caches."""
+
+    def test_payloads_round_trip_as_compact_json(self, fake_redis):
+        """Test session and data payloads are stored without whitespace and read back from bytes."""
+        fake_redis.decode_responses = False
+        SessionManager.store_session('s1', {'user': 'u1', 'symbols': ['TCS.NS', 'INFY.NS']})
+        DataCache.set('quote', {'price': 101.5, 'volume': 3})
+
+        assert fake_redis.store['data:quote'] == '{"price":101.5,"volume":3}'
+        assert SessionManager.get_session('s1') == {'user': 'u1', 'symbols': ['TCS.NS', 'INFY.NS']}
+        assert DataCache.get('quote') == {'price': 101.5, 'volume': 3}
+        assert DataCache.get('missing') is None
+
+    def test_user_profiles_expire_after_user_cache_ttl(self, fake_redis):
+        """Test cached user profiles round-trip and carry the short user-cache TTL."""
+        profile = {'user_id': 'g1', 'email': 'a@b.c', 'name': 'A', 'picture': None}
+        UserCache.set('g1', profile)
+
+        assert UserCache.get('g1') == profile
+        assert UserCache.get('g2') is None
+        assert fake_redis.ttls['user:g1'] == RedisConfig.USER_CACHE_TTL
+
+
+class TestRateLimiter:
+    """Tests for the fixed-window rate limiter."""
+
+    def test_allows_exactly_max_requests(self, fake_redis):
+        """Test the limit admits max_requests per window and starts the window TTL once."""
+        allowed = [RateLimiter.is_allowed('u1', 'chat', max_requests=3) for _ in range(5)]
+
+        assert allowed == [True, True, True, False, False]
+        assert fake_redis.ttls['rate_limit:u1:chat'] == RedisConfig.RATE_LIMIT_WINDOW
+        assert fake_redis.calls.count('expire') == 1
+        assert RateLimiter.get_remaining('u1', 'chat', max_requests=3) == 0
+
+    def test_uses_one_script_call_per_request(self, fake_redis):
+        """Test clients with scripting count each request with a single registered script call."""
+        def register_script(script):
+            fake_redis.calls.append('register_script')
+
+            def run(keys, args):
+                fake_redis.calls.append('evalsha')
+                count = int(fake_redis.store.get(keys[0], 0)) + 1
+                fake_redis.store[keys[0]] = str(count)
+                return count
+            return run
+        fake_redis.register_script = register_script
+
+        allowed = [RateLimiter.is_allowed('u2', 'chat', max_requests=2) for _ in range(3)]
+
+        assert allowed == [True, True, False]
+        assert fake_redis.calls == ['register_script', 'evalsha', 'evalsha', 'evalsha']
@@ -0,0 +1,162 @@
+"""
+Route tests for /api/get_data.
+
+Tests data source selection (local parquet, yfinance, stale local fallback),
+the Redis-backed daily history cache and the AI review worker handoff.
+Data loaders and the AI call are patched; no network access is needed.
+"""
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from backend import routes
+from backend.backtesting import get_data_lag_date
+
+
+def _ohlcv(end, periods):
+    """Create a synthetic daily OHLCV frame ending at `end`."""
+    index = pd.bdate_range(end=pd.Timestamp(end).normalize(), periods=periods, name='Date')
+    close = 100 + np.cumsum(np.random.default_rng(7).normal(0, 1, periods))
+    return pd.DataFrame({
+        'Open': close - 0.5,
+        'High': close + 1.0,
+        'Low': close - 1.0,
+        'Close': close,
+        'Volume': np.full(periods, 1000, dtype=np.int64),
+    }, index=index)
+
+
+@pytest.fixture
+def client():
+    """Test client for an app with only the api blueprint (no database)."""
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.register_blueprint(routes.api, url_prefix='/api')
+    return app.test_client()
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    """Patch auth, symbol validation, the data loaders and the AI call in backend.routes."""
+    calls = {'yfinance': 0, 'ai_threads': []}
+    frames = {'local': None, 'yfinance': None}
+
+    def load_stock_data(symbol, apply_lag=True):
+        df = frames['local']
+        return (df.copy() if df is not None else None), {'date_range': {}, 'cached': False}
+
+    def fetch_from_yfinance(symbol, period='90d', interval='1d'):
+        calls['yfinance'] += 1
+        df = frames['yfinance']
+        return df.copy() if df is not None else None
+
+    def get_ai_analysis(symbol, rows):
+        calls['ai_threads'].append(threading.current_thread().name)
+        return f'AI review of {symbol} ({len(rows)} rows)'
+
+    monkeypatch.setattr(routes, 'require_auth', lambda: None)
+    monkeypatch.setattr(routes, 'get_user_from_token', lambda: ('test-user', None))
+    monkeypatch.setattr(routes, 'validate_symbol', lambda symbol: (True, ''))
+    monkeypatch.setattr(routes, 'REDIS_AVAILABLE', False)
+    monkeypatch.setattr(routes, 'load_stock_data', load_stock_data)
+    monkeypatch.setattr(routes, 'fetch_from_yfinance', fetch_from_yfinance)
+    monkeypatch.setattr(routes, 'get_ai_analysis', get_ai_analysis)
+    return frames, calls
+
+
+def _get_data(client):
+    """POST /api/get_data for a test symbol and return the JSON body."""
+    response = client.post('/api/get_data', json={'symbol': 'TEST.NS'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+class TestGetDataSources:
+    """Tests for /get_data source selection."""
+
+    def test_current_local_data_skips_yfinance(self, client, sources):
+        """Test local parquet reaching the lag date is used without calling yfinance."""
+        frames, calls = sources
+        frames['local'] = _ohlcv(get_data_lag_date(), 120)
+
+        body = _get_data(client)
+
+        assert calls['yfinance'] == 0
+        assert body['data_source']['primary'] == 'local'
+        assert body['data_source']['yfinance_fallback'] is False
+        assert len(body['OHLCV']) == routes.GET_DATA_ROWS
+
+    def test_stale_local_data_uses_yfinance(self, client, sources):
+        """Test yfinance replaces local parquet that trails the lag date."""
+        frames, calls = sources
+        lag_date = get_data_lag_date()
+        frames['local'] = _ohlcv(lag_date - timedelta(days=20), 120)
+        frames['yfinance'] = _ohlcv(lag_date - timedelta(days=1), 60)
+
+        body = _get_data(client)
+
+        assert calls['yfinance'] == 1
+        assert body['data_source']['primary'] == 'yfinance'
+        assert body['data_source']['yfinance_fallback'] is True
+        assert body['OHLCV'][-1]['Date'] == frames['yfinance'].index[-1].strftime('%Y-%m-%d')
+
+    def test_stale_local_data_is_last_resort(self, client, sources):
+        """Test stale local parquet is served when yfinance returns nothing."""
+        frames, calls = sources
+        frames['local'] = _ohlcv(get_data_lag_date() - timedelta(days=20), 120)
+
+        body = _get_data(client)
+
+        assert calls['yfinance'] == 1
+        assert body['data_source']['primary'] == 'local'
+        assert body['data_source']['yfinance_available'] is False
+        assert body['OHLCV'][-1]['Date'] == frames['local'].index[-1].strftime('%Y-%m-%d')
+
+    def test_ai_review_runs_on_worker_thread(self, client, sources):
+        """Test the AI review is computed on the ai-analysis executor and returned."""
+        frames, calls = sources
+        frames['local'] = _ohlcv(get_data_lag_date(), 120)
+
+        body = _get_data(client)
+
+        assert body['AI_Review'] == 'AI review of TEST.NS (30 rows)'
+        assert len(calls['ai_threads']) == 1
+        assert calls['ai_threads'][0].startswith('ai-analysis')
+        assert body['Rule_Based_Analysis']
+
+
+class TestGetHistoryCached:
+    """Tests for the Redis-backed daily history cache."""
+
+    def test_cache_hit_round_trips_frame(self, fake_redis, sources, monkeypatch):
+        """Test a second lookup decodes the cached parquet without refetching."""
+        frames, calls = sources
+        monkeypatch.setattr(routes, 'REDIS_AVAILABLE', True)
+        frames['yfinance'] = _ohlcv(get_data_lag_date(), 60)
+
+        first = routes.get_history_cached('TEST.NS')
+        second = routes.get_history_cached('TEST.NS')
+
+        assert calls['yfinance'] == 1
+        pd.testing.assert_frame_equal(second, frames['yfinance'], check_freq=False)
+        pd.testing.assert_frame_equal(first, frames['yfinance'])
+
+        key = f"data:yf:TEST.NS:90d:{get_data_lag_date():%Y-%m-%d}"
+        assert key in fake_redis.store
+        assert 60 <= fake_redis.ttls[key] <= 86400
+
+    def test_unreadable_entry_refetches(self, fake_redis, sources, monkeypatch):
+        """Test a corrupt cache entry is discarded and yfinance is called again."""
+        frames, calls = sources
+        monkeypatch.setattr(routes, 'REDIS_AVAILABLE', True)
+        frames['yfinance'] = _ohlcv(get_data_lag_date(), 60)
+        routes.DataCache.set(f"yf:TEST.NS:90d:{get_data_lag_date():%Y-%m-%d}", 'not-parquet')
+
+        hist = routes.get_history_cached('TEST.NS')
+
+        assert calls['yfinance'] == 1
+        pd.testing.assert_frame_equal(hist, frames['yfinance'])